@@ -0,0 +1,90 @@
+"""
+Elsakr Favicon Generator - Archive Export
+Stream encoded artifacts into zip or tar archives without temporary files.
+"""
+
+import io
+import sys
+import time
+import tarfile
+import zipfile
+
+ARCHIVE_FORMATS = ('zip', 'tar', 'tar.gz')
+
+
+def format_for(path):
+    """Archive format implied by a file name, or None."""
+    lower = path.lower()
+    if lower.endswith(('.tar.gz', '.tgz')):
+        return 'tar.gz'
+    if lower.endswith('.tar'):
+        return 'tar'
+    if lower.endswith('.zip'):
+        return 'zip'
+    return None
+
+
+class ArchiveWriter:
+    """Write artifacts into an archive on a (possibly unseekable) stream.
+
+    Each add() writes the entry through to fileobj immediately, so only
+    the artifact being added is held in memory. Zip entries on unseekable
+    streams such as stdout use data descriptors; tar uses stream mode.
+    """
+
+    def __init__(self, fileobj, fmt='zip', prefix='', close_stream=False):
+        if fmt not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format {fmt!r}")
+        self.fmt = fmt
+        self.prefix = prefix
+        self.fileobj = fileobj
+        self.close_stream = close_stream
+        self.count = 0
+        self.bytes = 0
+        if fmt == 'zip':
+            self._archive = zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED)
+        else:
+            self._archive = tarfile.open(fileobj=fileobj,
+                                         mode='w|gz' if fmt == 'tar.gz' else 'w|')
+
+    def add(self, name, data):
+        """Append one file to the archive."""
+        name = self.prefix + name
+        if self.fmt == 'zip':
+            self._archive.writestr(zipfile.ZipInfo(name, time.localtime()[:6]), data,
+                                   compress_type=zipfile.ZIP_DEFLATED)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            info.mode = 0o644
+            self._archive.addfile(info, io.BytesIO(data))
+        self.count += 1
+        self.bytes += len(data)
+
+    def add_artifact(self, artifact):
+        self.add(artifact.filename, artifact.data)
+
+    def close(self):
+        self._archive.close()
+        if self.close_stream:
+            self.fileobj.close()
+        else:
+            self.fileobj.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_archive(path, fmt=None):
+    """ArchiveWriter for a file path, or for stdout if path is '-'."""
+    fmt = fmt or format_for(path)
+    if fmt is None:
+        raise ValueError(f"Cannot tell the archive format of {path!r}; use "
+                         f"one of {', '.join(ARCHIVE_FORMATS)}")
+    if path == '-':
+        return ArchiveWriter(sys.stdout.buffer, fmt)
+    return ArchiveWriter(open(path, 'wb'), fmt, close_stream=True)
@@ -0,0 +1,447 @@
+"""
+Elsakr Favicon Generator - Benchmarks
+Reproducible timings for the render and encode hot paths.
+
+    python benchmark.py                       # run and compare with the baseline
+    python benchmark.py --full                # include 16k sources
+    python benchmark.py --update-baseline     # record a new baseline
+    python benchmark.py --case startup        # cold-start times only
+    python benchmark.py --case write          # output write throughput only
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import subprocess
+import argparse
+import tempfile
+import statistics
+import PIL
+from PIL import Image, ImageDraw
+
+from composite import flatten_batch, flatten_premultiplied
+from engine import (FaviconEngine, RenderPlan, build_proxy, flatten, prepare_image,
+                    render_previews)
+from loader import WORKING_SIZE, load_source, peak_rss, working_size_for
+from staging import StagedOutput, write_atomic
+
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "benchmark-baseline.json")
+
+DEFAULT_THRESHOLD = 0.25
+
+# Differences below this are timer noise, whatever the ratio (seconds)
+NOISE_FLOOR = 0.002
+
+# Same slots as the GUI preview grid: name -> (favicon size, display size)
+PREVIEW_SLOTS = {
+    'favicon.ico': ((48, 48), 48),
+    'favicon-16x16.png': ((16, 16), 16),
+    'favicon-32x32.png': ((32, 32), 32),
+    'apple-touch-icon.png': ((180, 180), 60),
+    'android-chrome-192x192.png': ((192, 192), 70),
+    'mstile-150x150.png': ((150, 150), 55),
+}
+
+MODES = ('RGB', 'RGBA', 'P', 'L', 'CMYK')
+
+
+def source_matrix(full=False):
+    """(width, height, mode) of every synthetic source.
+
+    Three sweeps around an RGBA 1024 px square: resolution, color mode and
+    aspect ratio.
+    """
+    resolutions = [256, 1024, 4096] + ([16384] if full else [])
+    matrix = [(size, size, 'RGBA') for size in resolutions]
+    matrix += [(1024, 1024, mode) for mode in MODES if mode != 'RGBA']
+    matrix += [(1024, 576, 'RGBA'), (600, 1800, 'RGBA'), (4096, 2304, 'RGB')]
+    return matrix
+
+
+def make_source(width, height, mode):
+    """Deterministic synthetic logo: gradient, shapes and a transparent margin."""
+    img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    gradient = Image.linear_gradient('L').resize((width, height))
+    body = Image.merge('RGB', (gradient, gradient.rotate(90).resize((width, height)),
+                               Image.new('L', (width, height), 160)))
+    mask = Image.new('L', (width, height), 0)
+    draw = ImageDraw.Draw(mask)
+    margin = min(width, height) // 10
+    draw.ellipse((margin, margin, width - margin, height - margin), fill=255)
+    img.paste(body, mask=mask)
+
+    draw = ImageDraw.Draw(img)
+    stroke = max(1, min(width, height) // 64)
+    for i in range(8):
+        x = width * (i + 1) // 9
+        draw.line((x, margin, width - x, height - margin),
+                  fill=(255, 255 - i * 30, i * 30, 255), width=stroke)
+
+    if mode == 'RGBA':
+        return img
+    if mode == 'P':
+        return img.quantize(colors=64)
+    return img.convert('RGB').convert(mode) if mode == 'CMYK' else img.convert(mode)
+
+
+def make_ringing_source(size=1100):
+    """Opaque white beside thin dark strokes beside transparency.
+
+    Lanczos overshoots on these edges, pushing premultiplied colors above
+    alpha in the downscaled levels.
+    """
+    img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, size // 2, size - 1), fill=(255, 255, 255, 255))
+    x = size // 2
+    for width in (1, 2, 3, 5):
+        draw.rectangle((x, 0, x + width - 1, size - 1), fill=(20, 20, 20, 255))
+        draw.rectangle((x + width, 0, x + width + 7, size - 1), fill=(255, 255, 255, 255))
+        x += width + 8
+    return img
+
+
+# Backgrounds the flatten check composites onto
+CHECK_BACKGROUNDS = ('#FFFFFF', '#000000', '#3366CC')
+
+
+def check_flatten(log=print):
+    """Compare flatten_batch pixel for pixel with the Pillow path.
+
+    Returns a message for every size and background where they differ.
+    """
+    sizes = FaviconEngine(workers=1).render_sizes()
+    plan = RenderPlan(make_ringing_source(), sizes)
+    frames = [plan.premultiplied(size) for size in sizes]
+    failures = []
+    for bg_color in CHECK_BACKGROUNDS:
+        for size, frame, flat in zip(sizes, frames, flatten_batch(frames, bg_color)):
+            expected = flatten_premultiplied(frame, bg_color)
+            if flat.tobytes() != expected.tobytes():
+                failures.append(f"flatten_batch differs from the Pillow path at "
+                                f"{size[0]}x{size[1]} on {bg_color}")
+    log(f"{'check/flatten':<40} {'ok' if not failures else 'FAILED'}")
+    return failures
+
+
+# Sources above Pillow's decompression bomb limit (about 179 MP) that must
+# still load: a JPEG that draft decoding shrinks, a PNG downsampled in strips
+LARGE_SOURCES = (('JPEG', 'L', 14000, 14000), ('PNG', '1', 20000, 10000))
+
+
+def check_large_sources(log=print):
+    """Load every LARGE_SOURCES file into a working master.
+
+    Returns a message for every source that fails to load or comes out
+    at the wrong size.
+    """
+    workdir = tempfile.mkdtemp(prefix="favicon-bench-")
+    failures = []
+    try:
+        for format, mode, width, height in LARGE_SOURCES:
+            path = os.path.join(workdir, f"large.{format.lower()}")
+            Image.new(mode, (width, height), 1).save(path, format)
+            label = f"{width}x{height} {format}"
+            try:
+                master = load_source(path).image
+            except Exception as e:
+                failures.append(f"{label} failed to load: {e}")
+                continue
+            if max(master.size) != WORKING_SIZE:
+                failures.append(f"{label} loaded at {master.size[0]}x{master.size[1]}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    log(f"{'check/large_sources':<40} {'ok' if not failures else 'FAILED'}")
+    return failures
+
+
+def has_display():
+    """True if Tk can open a window here."""
+    try:
+        import tkinter
+        root = tkinter.Tk()
+        root.withdraw()
+        root.destroy()
+        return True
+    except Exception:
+        return False
+
+
+def case_prepare_image(ctx):
+    for size in ctx['sizes']:
+        prepare_image(ctx['source'], size)
+
+
+def case_render_plan(ctx):
+    RenderPlan(ctx['source'], ctx['sizes'])
+
+
+def case_previews(ctx):
+    render_previews(build_proxy(ctx['source']), PREVIEW_SLOTS)
+
+
+def case_previews_tk(ctx):
+    from PIL import ImageTk
+    previews = render_previews(build_proxy(ctx['source']), PREVIEW_SLOTS)
+    [ImageTk.PhotoImage(img) for img in previews.values()]
+
+
+def case_generate(ctx):
+    ctx['engine'].render(ctx['master'])
+
+
+def case_ico_encode(ctx):
+    ctx['engine']._build(ctx['ico_target'], ctx['ico_frames'])
+
+
+def case_flatten_paste(ctx):
+    # The previous per-image path: unpremultiply, new canvas, split, paste
+    for img in ctx['frames']:
+        flatten(img.convert('RGBA'), '#FFFFFF')
+
+
+def case_flatten_batch(ctx):
+    flatten_batch(ctx['frames'], '#FFFFFF')
+
+
+def case_load(ctx):
+    load_source(ctx['path'], ctx['working_size'])
+
+
+CASES = {
+    'load': case_load,
+    'prepare_image': case_prepare_image,
+    'render_plan': case_render_plan,
+    'previews': case_previews,
+    'previews_tk': case_previews_tk,
+    'generate': case_generate,
+    'ico_encode': case_ico_encode,
+    'flatten_paste': case_flatten_paste,
+    'flatten_batch': case_flatten_batch,
+}
+
+# Cases that need a display
+DISPLAY_CASES = {'previews_tk'}
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Cold-start commands, each timed in a fresh interpreter: name -> (argv, needs display).
+# The headless ones also fail if they pull in Tk.
+NO_TK = "import sys; assert 'tkinter' not in sys.modules, 'Tk imported'"
+STARTUP = {
+    'import_engine': ([sys.executable, '-c', f"import engine; {NO_TK}"], False),
+    'cli_help': ([sys.executable, '-c',
+                  f"import cli, contextlib, io\n"
+                  f"with contextlib.redirect_stdout(io.StringIO()):\n"
+                  f"    try: cli.main(['--help'])\n"
+                  f"    except SystemExit: pass\n{NO_TK}"], False),
+    'launcher_cli': ([sys.executable, 'main.py', 'cli', '--help'], False),
+    'gui': ([sys.executable, 'main.py', '--startup-probe'], True),
+}
+
+
+def time_startup(argv, repeat):
+    """Wall time of a fresh process running argv, including interpreter start."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(argv, cwd=HERE, check=True, stdout=subprocess.DEVNULL)
+        runs.append(time.perf_counter() - start)
+    return {'median': statistics.median(runs), 'min': min(runs), 'runs': repeat}
+
+
+def write_set(artifacts, folder):
+    for artifact in artifacts:
+        write_atomic(os.path.join(folder, artifact.filename), artifact.data)
+
+
+def write_direct(artifacts, output):
+    os.makedirs(output, exist_ok=True)
+    write_set(artifacts, output)
+
+
+def write_staged(artifacts, output, fsync=False):
+    with StagedOutput(output, keep=1, fsync=fsync) as staging:
+        write_set(artifacts, staging.path)
+
+
+# Output write strategies for one full set, timed on local disk (the temp folder)
+WRITES = {
+    'direct': write_direct,
+    'staged': write_staged,
+    'staged_fsync': lambda artifacts, output: write_staged(artifacts, output, fsync=True),
+}
+
+
+def time_writes(workdir, repeat, log=print):
+    """Seconds and bytes per second to write one rendered set with each strategy."""
+    engine = FaviconEngine(workers=1)
+    artifacts = engine.render(make_source(1024, 1024, 'RGBA'))
+    total = sum(len(artifact.data) for artifact in artifacts)
+    results = {}
+    for name, write in WRITES.items():
+        output = os.path.join(workdir, f"write-{name}", "favicons")
+        key = f"write/{name}"
+        results[key] = time_case(lambda ctx: write(artifacts, output), None, repeat)
+        results[key]['bytes_per_second'] = total / results[key]['median']
+        log(f"{key:<40} {results[key]['median'] * 1000:10.2f} ms "
+            f"({results[key]['bytes_per_second'] / 2 ** 20:.1f} MB/s, {len(artifacts)} files)")
+    return results
+
+
+def build_context(width, height, mode, workdir):
+    """Everything the cases need for one source, prepared outside the timings."""
+    source = make_source(width, height, mode)
+    ext = '.tiff' if mode == 'CMYK' else '.png'
+    path = os.path.join(workdir, f"{mode}-{width}x{height}{ext}")
+    source.save(path)
+
+    engine = FaviconEngine(workers=1)
+    sizes = engine.render_sizes()
+    working_size = working_size_for(sizes)
+    master = load_source(path, working_size).image
+    ico_target = next(t for t in engine.profile.targets if t.type == 'ico')
+    plan = RenderPlan(master, sizes)
+    return {
+        'source': source, 'path': path, 'engine': engine, 'sizes': sizes,
+        'working_size': working_size, 'master': master, 'ico_target': ico_target,
+        'ico_frames': [plan.get(size) for size in ico_target.sizes],
+        'frames': [plan.premultiplied(size) for size in sizes],
+    }
+
+
+def time_case(fn, ctx, repeat):
+    """Run fn(ctx) repeat times; return the median and minimum in seconds."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(ctx)
+        runs.append(time.perf_counter() - start)
+    return {'median': statistics.median(runs), 'min': min(runs), 'runs': repeat}
+
+
+def run(full=False, repeat=3, cases=None, log=print):
+    """Run the suite and return a results document."""
+    display = has_display()
+    selected = [name for name in (cases or CASES)
+                if name in CASES and (display or name not in DISPLAY_CASES)]
+    results = {}
+    if cases is None or 'startup' in cases:
+        for name, (argv, needs_display) in STARTUP.items():
+            if display or not needs_display:
+                key = f"startup/{name}"
+                results[key] = time_startup(argv, repeat)
+                log(f"{key:<40} {results[key]['median'] * 1000:10.2f} ms")
+
+    workdir = tempfile.mkdtemp(prefix="favicon-bench-")
+    try:
+        if cases is None or 'write' in cases:
+            results.update(time_writes(workdir, max(repeat, 5), log))
+        for width, height, mode in source_matrix(full):
+            ctx = build_context(width, height, mode, workdir)
+            for name in selected:
+                # 16k sources take seconds per run; one round is representative
+                rounds = 1 if max(width, height) > 4096 else repeat
+                key = f"{name}/{mode}/{width}x{height}"
+                results[key] = time_case(CASES[name], ctx, rounds)
+                log(f"{key:<40} {results[key]['median'] * 1000:10.2f} ms")
+            del ctx
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'machine': {
+            'python': platform.python_version(),
+            'pillow': PIL.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'display': display,
+        },
+        'peak_rss': peak_rss(),
+        'results': results,
+    }
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Cases whose median got slower than the baseline by more than threshold.
+
+    Returns a list of (case, baseline seconds, current seconds, ratio).
+    """
+    regressions = []
+    for key, current in results['results'].items():
+        previous = baseline.get('results', {}).get(key)
+        if not previous or not previous['median']:
+            continue
+        ratio = current['median'] / previous['median']
+        if ratio > 1 + threshold and current['median'] - previous['median'] > NOISE_FLOOR:
+            regressions.append((key, previous['median'], current['median'], ratio))
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="favicon-benchmark",
+        description="Benchmark the favicon render and encode hot paths."
+    )
+    parser.add_argument("-o", "--output", default="benchmark-results.json",
+                        help="where to write the results (default: %(default)s)")
+    parser.add_argument("--baseline", default=BASELINE_FILE,
+                        help="baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown before a case counts as a "
+                             "regression (default: %(default)s = 25%%)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per case; the median is reported")
+    parser.add_argument("--case", action="append", choices=sorted(CASES) + ['startup', 'write'],
+                        help="only run this case (repeatable)")
+    parser.add_argument("--full", action="store_true",
+                        help="include 16k px sources (slow, needs several GB of RAM)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="write the results as the new baseline")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    failures = check_flatten() + check_large_sources()
+    for message in failures:
+        print(f"CHECK FAILED {message}")
+    if failures:
+        return 1
+    results = run(full=args.full, repeat=args.repeat, cases=args.case)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    except OSError:
+        print("No baseline to compare against.")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for key, before, after, ratio in regressions:
+        print(f"REGRESSION {key}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms "
+              f"({(ratio - 1) * 100:+.0f}%)")
+    if regressions:
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Elsakr Favicon Generator - Incremental Cache
+Content-addressed record of the artifacts already in an output folder.
+"""
+
+import os
+import json
+import hashlib
+
+
+CACHE_FILE = ".favicon-cache.json"
+CACHE_VERSION = 1
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_set_id(paths, working_size):
+    """Cache identity of a source and its size masters at a working size."""
+    return ':'.join([hash_file(path) for path in paths] + [str(working_size)])
+
+
+def hash_key(payload):
+    """Stable SHA-256 of a JSON-serializable payload."""
+    data = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class OutputCache:
+    """The cache manifest stored next to the generated files.
+
+    Each entry maps an artifact name to the key of the inputs it was
+    rendered from and the size of the file written, so a re-run can skip
+    artifacts whose inputs and file are unchanged.
+    """
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.path = os.path.join(output_path, CACHE_FILE)
+        self.entries = {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                self.entries = data.get('artifacts', {})
+        except (OSError, ValueError):
+            pass
+
+    def is_current(self, name, key):
+        """True if name was written from key and is still on disk unchanged."""
+        entry = self.entries.get(name)
+        if not entry or entry.get('key') != key:
+            return False
+        path = os.path.join(self.output_path, self.filename(name))
+        try:
+            if os.path.getsize(path) != entry.get('size'):
+                return False
+        except OSError:
+            return False
+        return all(os.path.exists(path + ext) for ext in self.sidecars(name))
+
+    def filename(self, name):
+        """File the artifact was last written as (fingerprinted or not)."""
+        return self.entries.get(name, {}).get('file', name)
+
+    def sidecars(self, name):
+        """Extensions of the precompressed copies written next to the file."""
+        return self.entries.get(name, {}).get('sidecars', [])
+
+    def filenames(self):
+        return {name: self.filename(name) for name in self.entries}
+
+    def record(self, name, key, size, filename=None, sidecars=()):
+        self.entries[name] = {'key': key, 'size': size}
+        if filename and filename != name:
+            self.entries[name]['file'] = filename
+        if sidecars:
+            self.entries[name]['sidecars'] = sorted(sidecars)
+
+    def forget(self, name):
+        self.entries.pop(name, None)
+
+    def save(self):
+        """Write the manifest atomically."""
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'artifacts': self.entries},
+                      f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
@@ -0,0 +1,472 @@
+"""
+Elsakr Favicon Generator - Command Line
+Batch favicon generation without a display.
+"""
+
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image
+
+from archive import ARCHIVE_FORMATS, open_archive
+from cache import source_set_id
+from engine import (ASSET_MAP_FILE, FaviconEngine, compare_with_legacy, find_sources,
+                    master_paths, master_source, measure_workers, output_names)
+from events import EventBus, Pump, dispatch
+from instrument import Recorder
+from loader import DEFAULT_MEMORY_LIMIT, load_source_set, peak_rss, working_size_for
+from output_profile import available_profiles, load_profile
+from sidecars import DEFAULT_MIN_SAVING, parse_encodings
+from staging import DEFAULT_KEEP
+from watcher import DEFAULT_DEBOUNCE, SourceWatcher
+
+
+def engine_for(options, recorder=None):
+    """FaviconEngine configured from an options dict."""
+    return FaviconEngine(bg_color=options['bg'], profile=load_profile(options['profile']),
+                         workers=options['threads'], recorder=recorder,
+                         keep_alpha=options['keep_alpha'],
+                         optimize_png=options['optimize'],
+                         png_tolerance=options['tolerance'],
+                         fingerprint=options['fingerprint'],
+                         precompress=options['precompress'],
+                         min_saving=options['min_saving'])
+
+
+def render_source(path, output_path, options):
+    """Render one source image into output_path (runs in a worker process).
+
+    options is a plain dict built by options_from_args. Artifacts that are
+    already up to date are skipped, and the source is not even decoded when
+    nothing changed. Returns a dict with the number of files written and
+    skipped, the worker's peak RSS and any recorded instrumentation events.
+    """
+    recorder = Recorder(options['track_memory']) if options['instrument'] else None
+    engine = engine_for(options, recorder)
+    working_size = working_size_for(engine.render_sizes())
+    masters = master_paths(path)
+    source_id = source_set_id([path] + masters, working_size)
+    total = engine.total_steps()
+    result = {'written': 0, 'skipped': total, 'events': [], 'reports': {}, 'sidecars': {},
+              'variants': {}}
+
+    if options['force'] or engine.stale_targets(output_path, source_id):
+        source = load_source_set(path, masters, working_size, options['memory_limit'],
+                                 recorder=engine.recorder)
+        if options['atomic']:
+            artifacts = engine.generate_staged(source.images, output_path,
+                                               keep=options['keep_sets'],
+                                               fsync=options['fsync'],
+                                               source_id=source_id, force=options['force'])
+        else:
+            artifacts = engine.generate(source.images, output_path,
+                                        source_id=source_id, force=options['force'])
+        result['written'] = len(artifacts)
+        result['reports'] = {a.name: a.info['png'] for a in artifacts if 'png' in a.info}
+        result['sidecars'] = {a.filename: a.info['sidecars'] for a in artifacts
+                              if 'sidecars' in a.info}
+        result['variants'] = {a.name: a.info['variant'] for a in artifacts
+                              if 'variant' in a.info}
+        result['skipped'] = total - len(artifacts)
+
+    if recorder:
+        result['events'] = recorder.events
+    result['peak_rss'] = peak_rss()
+    return result
+
+
+def print_png_reports(reports, stream=None):
+    """Per-artifact savings of the PNG optimizer."""
+    before = after = 0
+    for name, report in reports.items():
+        before += report['original_bytes']
+        after += report['bytes']
+        print(f"    {name}: {report['original_bytes']} -> {report['bytes']} bytes "
+              f"({report['encoding']}, {report['seconds'] * 1000:.0f} ms)", file=stream)
+    if reports:
+        print(f"    PNG total: {before} -> {after} bytes "
+              f"({(before - after) * 100 / before:.1f}% saved)", file=stream)
+
+
+def print_sidecar_reports(reports, stream=None):
+    """Per-file savings of the precompressed sidecars."""
+    for filename, report in reports.items():
+        parts = []
+        for ext, entry in report.items():
+            state = "" if entry['kept'] else ", skipped"
+            parts.append(f"{ext} {entry['bytes']} bytes ({entry['saving']:.0%} saved{state})")
+        print(f"    {filename}: " + "; ".join(parts), file=stream)
+
+
+def print_variant_reports(reports, stream=None):
+    """Quality chosen for each WebP/AVIF variant and whether it met its budget."""
+    for name, report in reports.items():
+        state = "" if report['within_budget'] else ", over budget"
+        print(f"    {name}: {report['bytes']} bytes at quality {report['quality']} "
+              f"({report['tried']} tried, {report['seconds'] * 1000:.0f} ms{state})",
+              file=stream)
+
+
+def options_from_args(args, threads):
+    """Picklable per-source settings for worker processes."""
+    return {
+        'bg': args.bg,
+        'keep_alpha': args.keep_alpha,
+        'optimize': args.optimize,
+        'tolerance': args.tolerance,
+        'fingerprint': args.fingerprint,
+        'precompress': args.precompress,
+        'min_saving': args.min_saving,
+        'profile': args.profile,
+        'threads': threads,
+        'memory_limit': args.memory_limit * 2 ** 20,
+        'force': args.force,
+        'atomic': args.atomic,
+        'keep_sets': args.keep_sets,
+        'fsync': args.fsync,
+        'instrument': bool(args.timings or args.trace),
+        'track_memory': args.memory,
+    }
+
+
+def format_bytes(value):
+    """Human readable size for reports."""
+    if value is None:
+        return "n/a"
+    return f"{value / 2 ** 20:.1f} MB"
+
+
+def compare_source(path, profile_name=None, threads=None):
+    """Time the render plan and the thread pool for one source."""
+    profile = load_profile(profile_name)
+    engine = FaviconEngine(profile=profile)
+    with Image.open(path) as source:
+        source.load()
+        timings = compare_with_legacy(source, engine.render_sizes())
+        timings.update(measure_workers(source, profile, threads))
+        return timings
+
+
+class ConsoleView:
+    """Print the events of a batch run, as drained from an EventBus.
+
+    Results are printed one line per source. On a terminal, progress is
+    shown as a single status line on stderr that is rewritten in place,
+    at most once per drain.
+    """
+
+    def __init__(self, stream=None, live=None):
+        self.stream = stream or sys.stdout
+        self.live = sys.stderr.isatty() if live is None else live
+        self._status = False
+
+    def _clear(self):
+        if self._status:
+            sys.stderr.write("\r\033[K")
+            self._status = False
+
+    def on_progress(self, step, total, status=None):
+        if self.live:
+            sys.stderr.write(f"\r\033[K[{step}/{total}] {status or ''}"[:200])
+            sys.stderr.flush()
+            self._status = True
+
+    def on_rendered(self, path, result):
+        self._clear()
+        print(f"✓ {path} ({result['written']} written, {result['skipped']} up to date, "
+              f"worker peak RSS {format_bytes(result['peak_rss'])})", file=self.stream)
+        print_png_reports(result['reports'], self.stream)
+        print_sidecar_reports(result['sidecars'], self.stream)
+        print_variant_reports(result['variants'], self.stream)
+
+    def on_exported(self, path, count):
+        self._clear()
+        print(f"✓ {path} ({count} files archived)", file=self.stream)
+
+    def on_failed(self, path, error):
+        self._clear()
+        print(f"✗ {path}: {error}", file=sys.stderr)
+
+    def handle(self, events):
+        dispatch(events, self)
+        self.stream.flush()
+
+    def close(self):
+        self._clear()
+        self.stream.flush()
+
+
+def export_sources(sources, archive, names, options, recorder):
+    """Stream every source's set into one archive, one source at a time.
+
+    A single source's files sit at the archive root (names is None); in
+    batch runs each source gets the folder names maps it to. Status goes
+    to stderr so the archive can be written to stdout. Returns the number
+    of failures.
+    """
+    failures = 0
+    engine = engine_for(options, recorder)
+    working_size = working_size_for(engine.render_sizes())
+    bus = EventBus()
+    view = ConsoleView(sys.stderr)
+    with Pump(bus, view.handle):
+        for path in sources:
+            if names:
+                archive.prefix = names[path].replace(os.sep, '/') + '/'
+            try:
+                source = load_source_set(path, master_paths(path), working_size,
+                                         options['memory_limit'], recorder=engine.recorder)
+                count = engine.export(source.images, archive, on_progress=bus.progress)
+                bus.publish('exported', path=path, count=count)
+            except Exception as e:
+                failures += 1
+                bus.publish('failed', path=path, error=e)
+    view.close()
+    return failures
+
+
+def run_batch(pool, sources, output_root, names, options, recorder):
+    """Render sources on the process pool, printing one line per source.
+
+    Outcomes go through an EventBus that a ConsoleView drains on its own
+    thread, so large batches print in batches rather than per future.
+    names maps each source to its folder in batch runs (see output_names);
+    None writes a single source to <output_root>/favicons. Returns the
+    number of sources that failed.
+    """
+    failures = 0
+    futures = {
+        pool.submit(render_source, path,
+                    output_dir_for(path, output_root, names), options): path
+        for path in sources
+    }
+    bus = EventBus()
+    view = ConsoleView()
+    with Pump(bus, view.handle):
+        for done, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                result = future.result()
+                recorder.extend(result['events'])
+                bus.publish('rendered', path=path, result=result)
+            except Exception as e:
+                failures += 1
+                bus.publish('failed', path=path, error=e)
+            bus.progress(done, len(futures), path)
+    view.close()
+    return failures
+
+
+def watch_sources(pool, args, multiple, options, recorder):
+    """Re-render changed sources until interrupted.
+
+    The incremental cache makes each pass rewrite only the artifacts whose
+    inputs changed; a save that leaves the content as it was writes nothing.
+    """
+    def on_change(paths):
+        # an edited size master re-renders the source it belongs to
+        paths = {master_source(path) or path for path in paths}
+        changed = [path for path in sorted(paths) if os.path.isfile(path)]
+        if not changed:
+            return
+        names = None
+        if multiple:
+            # folder names depend on every source, including ones added since
+            current = {os.path.abspath(path) for path in find_sources(args.sources)}
+            try:
+                names = output_names(sorted(current | set(changed)))
+            except ValueError as e:
+                print(f"Cannot name output folders: {e}", file=sys.stderr)
+                return
+        run_batch(pool, changed, args.output, names, options, recorder)
+
+    watcher = SourceWatcher(args.sources, on_change, debounce=args.debounce,
+                            polling=args.poll)
+    print(f"Watching {', '.join(args.sources)} ({watcher.backend.name}); "
+          f"press Ctrl+C to stop.")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+    return 0
+
+
+def output_dir_for(path, output_root, names):
+    """Output folder for a source: one sub-folder per source in batch runs."""
+    if names is None:
+        return os.path.join(output_root, "favicons")
+    return os.path.join(output_root, names[path])
+
+
+def encodings_arg(value):
+    try:
+        return parse_encodings(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="favicon-generator",
+        description="Generate all favicon sizes from one or more images."
+    )
+    parser.add_argument("sources", nargs="+",
+                        help="source images or directories containing images")
+    parser.add_argument("-o", "--output", default=".",
+                        help="output folder (default: current directory)")
+    parser.add_argument("--bg", default="#FFFFFF",
+                        help="background color for transparent images")
+    parser.add_argument("--keep-alpha", action="store_true",
+                        help="keep transparency instead of flattening onto --bg "
+                             "(targets with a fixed background color still get it)")
+    parser.add_argument("--optimize", action="store_true",
+                        help="search palette, bit depth and zlib settings for the "
+                             "smallest PNGs and report the savings")
+    parser.add_argument("--tolerance", type=float, default=0.0,
+                        help="mean per-channel error (0-255) allowed for palette "
+                             "quantization with --optimize (default: lossless)")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="put a content hash in file names, point the HTML and "
+                             "manifest at them and write %s" % ASSET_MAP_FILE)
+    parser.add_argument("--precompress", nargs="?", const="auto", type=encodings_arg,
+                        default=[], metavar="gz,br",
+                        help="also write maximally compressed .gz/.br copies of "
+                             "compressible files (default: gz, plus br if brotli is installed)")
+    parser.add_argument("--min-saving", type=float, default=DEFAULT_MIN_SAVING,
+                        help="skip a sidecar that saves less than this fraction of the "
+                             "file (default: %(default)s)")
+    parser.add_argument("-p", "--profile", default=None,
+                        help="output profile: a bundled name (%s) or a JSON file"
+                             % ", ".join(available_profiles()))
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("-t", "--threads", type=int, default=None,
+                        help="encoding threads per source (default: CPU count "
+                             "for a single source, 1 per process in batch runs)")
+    parser.add_argument("--memory-limit", type=int, default=DEFAULT_MEMORY_LIMIT // 2 ** 20,
+                        metavar="MB",
+                        help="refuse sources that need more than this to decode "
+                             "(default: %(default)s MB, 0 disables the check; the "
+                             "limit on decoded pixels still applies)")
+    parser.add_argument("--archive", metavar="FILE",
+                        help="stream the set(s) into a .zip, .tar or .tar.gz instead of "
+                             "writing loose files; '-' writes to stdout")
+    parser.add_argument("--archive-format", choices=ARCHIVE_FORMATS,
+                        help="archive format when it cannot be told from --archive "
+                             "(required for stdout)")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and re-render sources when they change")
+    parser.add_argument("--poll", action="store_true",
+                        help="with --watch, poll file stats instead of using inotify")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE,
+                        help="with --watch, seconds without further writes before "
+                             "re-rendering (default: %(default)s)")
+    parser.add_argument("--force", action="store_true",
+                        help="re-render every artifact even if it is up to date")
+    parser.add_argument("--atomic", action="store_true",
+                        help="build each set in a staging folder and swap it into place, "
+                             "so readers never see a partial set")
+    parser.add_argument("--keep-sets", type=int, default=DEFAULT_KEEP, metavar="N",
+                        help="with --atomic, keep the N previous sets next to the output "
+                             "(default: %(default)s)")
+    parser.add_argument("--fsync", action="store_true",
+                        help="with --atomic, flush the staged set to disk before the swap")
+    parser.add_argument("--timings", metavar="FILE",
+                        help="write per-stage and per-artifact timings as JSON")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write a Chrome trace-event file (chrome://tracing, Perfetto)")
+    parser.add_argument("--memory", action="store_true",
+                        help="with --timings or --trace, also record the peak traced memory "
+                             "of each stage (renders each set on one thread, so stage peaks "
+                             "stay separate)")
+    parser.add_argument("--compare", action="store_true",
+                        help="report time saved by the render plan versus "
+                             "resizing every size from the full-resolution source")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.watch and args.archive:
+        print("--watch writes files; it cannot be combined with --archive", file=sys.stderr)
+        return 2
+
+    if args.memory and not (args.timings or args.trace):
+        print("--memory records into --timings or --trace; give one of them", file=sys.stderr)
+        return 2
+
+    sources = find_sources(args.sources)
+    if not sources and not args.watch:
+        print("No source images found.", file=sys.stderr)
+        return 2
+
+    try:
+        profile = load_profile(args.profile)
+    except ValueError as e:
+        print(f"Invalid profile: {e}", file=sys.stderr)
+        return 2
+    if profile.unavailable:
+        print(f"Skipping {', '.join(profile.unavailable)}: this Pillow build cannot "
+              f"write the format", file=sys.stderr)
+
+    if args.compare:
+        for path in sources:
+            t = compare_source(path, args.profile, args.threads)
+            print(f"{path}: per-size {t['legacy']:.3f}s, "
+                  f"render plan {t['plan']:.3f}s, saved {t['saved']:.3f}s")
+            print(f"{path}: full set 1 thread {t['serial']:.3f}s, "
+                  f"{t['workers']} threads {t['parallel']:.3f}s, "
+                  f"speedup {t['speedup']:.2f}x")
+        return 0
+
+    multiple = len(sources) > 1
+    try:
+        names = output_names(sources) if multiple else None
+    except ValueError as e:
+        print(f"Cannot name output folders: {e}", file=sys.stderr)
+        return 2
+    if args.archive:
+        options = options_from_args(args, args.threads)
+        recorder = Recorder(options['track_memory']) if options['instrument'] else None
+        try:
+            archive = open_archive(args.archive, args.archive_format)
+        except (OSError, ValueError) as e:
+            print(f"Cannot write archive: {e}", file=sys.stderr)
+            return 2
+        with archive:
+            failures = export_sources(sources, archive, names, options, recorder)
+        if recorder:
+            print(f"Slowest stages: {recorder.summary()}", file=sys.stderr)
+            if args.timings:
+                recorder.save_json(args.timings)
+            if args.trace:
+                recorder.save_trace(args.trace)
+        return 1 if failures else 0
+
+    # a watched folder may gain sources later, so give each its own folder
+    if args.watch and any(os.path.isdir(p) for p in args.sources):
+        multiple = True
+        names = output_names(sources)
+    threads = args.threads or (1 if multiple else None)
+    options = options_from_args(args, threads)
+    recorder = Recorder()
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        failures = run_batch(pool, sources, args.output, names, options, recorder)
+        if args.watch:
+            return watch_sources(pool, args, multiple, options, recorder)
+
+    print(f"Peak RSS: {format_bytes(peak_rss(children=True))} (largest worker)")
+    if recorder.events:
+        print(f"Slowest stages: {recorder.summary()}")
+    if args.timings:
+        recorder.save_json(args.timings)
+    if args.trace:
+        recorder.save_trace(args.trace)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,16 @@
+"""
+Elsakr Favicon Generator - Image Encoding
+Encode images into bytes in memory.
+"""
+
+import io
+
+
+def encode_image(img, fmt, **params):
+    """Encode img as fmt with the given save parameters and return the bytes."""
+    buf = io.BytesIO()
+    # Pillow keeps save parameters on the image object being saved, and
+    # frames are shared between artifacts encoded concurrently, so every
+    # save goes through a copy of its own
+    img.copy().save(buf, format=fmt, **params)
+    return buf.getvalue()
@@ -0,0 +1,697 @@
+"""
+Elsakr Favicon Generator - Render Engine
+Headless favicon rendering shared by the GUI and the command line.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import PIL
+from PIL import Image
+
+from cache import OutputCache, hash_key
+from composite import flatten_batch
+from encoding import encode_image
+from instrument import NULL_RECORDER
+from icofile import build_ico
+from output_profile import RenderGraph, load_profile
+from pngopt import optimize_png
+from sidecars import COMPRESSIBLE_TYPES, DEFAULT_MIN_SAVING, compress as compress_sidecars
+from staging import DEFAULT_KEEP, StagedOutput, write_atomic
+from variants import FORMATS as VARIANT_FORMATS, encode_variant
+
+
+# Bump whenever encoded output changes for identical inputs
+ENCODER_VERSION = "5"
+
+# Hex digits of the content hash in fingerprinted file names
+FINGERPRINT_LENGTH = 10
+
+ASSET_MAP_FILE = "asset-map.json"
+
+# The HTML snippet, written next to the set so it can be pasted into a page's <head>
+HTML_FILE = "favicon-links.html"
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp')
+
+# Hand-made size masters sit next to their source: logo@16.png, logo@64px.png
+MASTER_PATTERN = re.compile(r'^(.+)@(\d+)(?:px)?$', re.IGNORECASE)
+
+
+def square_image(img, recorder=NULL_RECORDER):
+    """Convert to RGBA and center the image on a transparent square canvas."""
+    if img.mode != 'RGBA':
+        with recorder.stage('convert'):
+            img = img.convert('RGBA')
+    if img.size[0] == img.size[1]:
+        return img
+
+    with recorder.stage('square'):
+        max_dim = max(img.size)
+        square = Image.new('RGBA', (max_dim, max_dim), (0, 0, 0, 0))
+        offset = ((max_dim - img.size[0]) // 2, (max_dim - img.size[1]) // 2)
+        square.paste(img, offset)
+    return square
+
+
+def prepare_image(img, size):
+    """Prepare image for a specific size."""
+    return square_image(img).resize(size, Image.Resampling.LANCZOS)
+
+
+class RenderPlan:
+    """Square the source once and derive every size from a downscale chain.
+
+    Sizes are rendered largest first. Each one is resampled from the
+    smallest already rendered level that is still at least MIN_RATIO times
+    larger, so no step is a near-1:1 resample that would soften the image,
+    and only the first level ever touches the full-resolution master.
+
+    source may also be a source set: a list of masters of one brand, such
+    as a pixel-hinted 16 px drawing next to the full-size logo. A size that
+    matches a smaller master exactly uses it as-is; other sizes below it
+    are resampled from the smallest master at or above them, and only the
+    sizes above every smaller master come from the largest one.
+    """
+
+    MIN_RATIO = 2.0
+
+    def __init__(self, source, sizes=(), recorder=NULL_RECORDER):
+        self.recorder = recorder
+        masters = sorted((square_image(img, recorder) for img in source_images(source)),
+                         key=lambda img: img.size[0])
+        # Levels stay premultiplied, so chained resizes do not round-trip alpha
+        with recorder.stage('premultiply'):
+            self.master = masters.pop().convert('RGBa')
+            self.masters = {img.size: img.convert('RGBa') for img in masters}
+        self.levels = {}
+        self.straight = {}
+        for size in sorted(set(sizes), key=lambda s: s[0], reverse=True):
+            self.premultiplied(size)
+
+    def premultiplied(self, size):
+        """Return the premultiplied RGBa image for size, rendering it on first use."""
+        if size in self.levels:
+            return self.levels[size]
+
+        larger = [master for master_size, master in self.masters.items()
+                  if master_size[0] >= size[0]]
+        base = self.master
+        reducing_gap = 3.0
+        if larger:
+            base = min(larger, key=lambda img: img.size[0])
+        else:
+            for level_size, level in self.levels.items():
+                if (level_size[0] >= size[0] * self.MIN_RATIO
+                        and level_size[0] < base.size[0]):
+                    base = level
+                    reducing_gap = None
+
+        if base.size == size:
+            img = base
+        else:
+            with self.recorder.stage('resize', "%dx%d" % size):
+                img = base.resize(size, Image.Resampling.LANCZOS,
+                                  reducing_gap=reducing_gap)
+        self.levels[size] = img
+        return img
+
+    def get(self, size):
+        """Return the straight-alpha RGBA image for size."""
+        if size not in self.straight:
+            self.straight[size] = self.premultiplied(size).convert('RGBA')
+        return self.straight[size]
+
+
+def source_images(source):
+    """The masters of a source: one image, or every image of a source set."""
+    if isinstance(source, (list, tuple)):
+        return list(source)
+    return [source]
+
+
+def build_proxy(source, max_dim=1024):
+    """Square the source once into a bounded proxy for previews.
+
+    For a source set only the largest master is reduced; smaller masters
+    are kept so previews show the hand-made sizes.
+    """
+    masters = sorted((square_image(img) for img in source_images(source)),
+                     key=lambda img: img.size[0])
+    square = masters.pop()
+    if square.size[0] > max_dim:
+        square = square.resize((max_dim, max_dim), Image.Resampling.LANCZOS,
+                               reducing_gap=3.0)
+    masters = [img for img in masters if img.size[0] < square.size[0]]
+    return masters + [square] if masters else square
+
+
+def render_previews(proxy, slots):
+    """Render preview thumbnails from a proxy image.
+
+    slots maps a name to (size, display_size); each preview is rendered at
+    its real favicon size and then scaled to its display size so small
+    icons show their actual detail. Returns a dict of name to RGBA image.
+    """
+    plan = RenderPlan(proxy, [size for size, _ in slots.values()])
+    previews = {}
+    for name, (size, display_size) in slots.items():
+        previews[name] = plan.get(size).resize((display_size, display_size),
+                                               Image.Resampling.LANCZOS)
+    return previews
+
+
+def compare_with_legacy(source, sizes):
+    """Time the per-size prepare_image path against a RenderPlan.
+
+    Returns a dict with both timings in seconds and the time saved.
+    """
+    start = time.perf_counter()
+    for size in sizes:
+        prepare_image(source, size)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    RenderPlan(source, sizes)
+    plan = time.perf_counter() - start
+
+    return {'legacy': legacy, 'plan': plan, 'saved': legacy - plan}
+
+
+def flatten(img, bg_color):
+    """Flatten an RGBA image onto a solid background color."""
+    if img.mode != 'RGBA':
+        return img
+    bg = Image.new('RGB', img.size, bg_color)
+    bg.paste(img, mask=img.split()[3])
+    return bg
+
+
+def build_manifest(target, profile, filenames=None):
+    """Build the site.webmanifest document for a manifest target.
+
+    filenames maps artifact names to the file names they were written as
+    (see fingerprinted_name); unmapped artifacts keep their own name.
+    WebP/AVIF variants of an icon are listed before it, so browsers that
+    support them pick the smaller file and the rest fall back to PNG.
+    """
+    filenames = filenames or {}
+    manifest = dict(target.fields)
+    manifest['icons'] = []
+    for icon in manifest_icons(target, profile):
+        manifest['icons'].append({
+            "src": "/" + filenames.get(icon.name, icon.name),
+            "sizes": "%dx%d" % icon.size,
+            "type": icon.mime_type,
+        })
+    return manifest
+
+
+def manifest_icons(target, profile):
+    """The icon targets a manifest lists: each icon's variants, then the icon."""
+    icons = []
+    for name in target.icons:
+        icons += profile.variants_of(name) + [profile.target(name)]
+    return icons
+
+
+def build_html(profile, filenames=None):
+    """Build the HTML snippet that links the profile's artifacts.
+
+    filenames maps artifact names to the file names they were written as,
+    for links and for meta contents such as "/mstile-144x144.png".
+    """
+    filenames = filenames or {}
+    lines = []
+    for target in profile.targets:
+        if not target.link:
+            continue
+        attrs = [f'rel="{target.link}"']
+        if target.link == 'icon':
+            attrs.append(f'type="{target.mime_type}"')
+        if target.size:
+            attrs.append('sizes="%dx%d"' % target.size)
+        attrs.append(f'href="/{filenames.get(target.name, target.name)}"')
+        lines.append(f'<link {" ".join(attrs)}>')
+    for meta in profile.meta:
+        content = meta['content']
+        # metas that point at an artifact (msapplication-TileImage) follow its file name
+        if content.startswith('/') and content[1:] in filenames:
+            content = '/' + filenames[content[1:]]
+        lines.append(f'<meta name="{meta["name"]}" content="{content}">')
+    return "\n".join(lines)
+
+
+def fingerprinted_name(name, data):
+    """name with a hash of data before the extension, e.g. icon.1a2b3c4d5e.png."""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:FINGERPRINT_LENGTH]}{ext}"
+
+
+class Cancelled(Exception):
+    """Raised when a render is cancelled between artifacts."""
+
+
+class Artifact:
+    """A single encoded output file held in memory.
+
+    filename is the name it is written as: the artifact name, or a
+    fingerprinted one. sidecars holds precompressed copies written next
+    to it. info carries per-artifact encoder details, e.g. the
+    PNG optimizer report.
+    """
+
+    def __init__(self, name, data, info=None, filename=None):
+        self.name = name
+        self.data = data
+        self.info = info or {}
+        self.filename = filename or name
+        # extension -> precompressed copy, e.g. {'.gz': ...}
+        self.sidecars = {}
+
+    def __repr__(self):
+        return f"Artifact({self.name!r}, {len(self.data)} bytes)"
+
+
+def default_workers():
+    """Default size of the per-set encoding thread pool."""
+    return min(8, os.cpu_count() or 1)
+
+
+def measure_workers(source, profile=None, workers=None):
+    """Time a full render serially and with a thread pool.
+
+    Returns a dict with both timings in seconds and the speedup.
+    """
+    workers = workers or default_workers()
+    timings = {}
+    for count in (1, workers):
+        engine = FaviconEngine(profile=profile, workers=count)
+        start = time.perf_counter()
+        engine.render(source)
+        timings[count] = time.perf_counter() - start
+    serial, parallel = timings[1], timings[workers]
+    return {'workers': workers, 'serial': serial, 'parallel': parallel,
+            'speedup': serial / parallel if parallel else 0.0}
+
+
+class FaviconEngine:
+    """Render a full favicon set from a source image without any GUI."""
+
+    def __init__(self, bg_color="#FFFFFF", profile=None, workers=None, recorder=None,
+                 keep_alpha=False, optimize_png=False, png_tolerance=0.0,
+                 fingerprint=False, precompress=(), min_saving=DEFAULT_MIN_SAVING):
+        self.bg_color = bg_color
+        self.keep_alpha = keep_alpha
+        self.optimize_png = optimize_png
+        self.png_tolerance = png_tolerance
+        self.fingerprint = fingerprint
+        self.precompress = list(precompress)
+        self.min_saving = min_saving
+        self.asset_map = {}
+        self.recorder = recorder or NULL_RECORDER
+        # tracemalloc's peak is process-wide, so memory is only per stage on one thread
+        self.workers = 1 if getattr(self.recorder, 'track_memory', False) \
+            else workers or default_workers()
+        self.profile = profile if profile is not None else load_profile()
+        # keep_alpha leaves "flatten" targets transparent; fixed colors still apply
+        self.graph = RenderGraph(self.profile, None if keep_alpha else bg_color)
+        self.html = build_html(self.profile)
+
+    def render_sizes(self):
+        """Every distinct pixel size the set needs."""
+        return self.graph.sizes()
+
+    def total_steps(self):
+        """Number of progress steps reported by render()."""
+        return len(self.graph.artifacts)
+
+    def render(self, source, on_progress=None, on_artifact=None, names=None,
+               cancel=None, collect=True, filenames=None):
+        """Render every artifact for the source image.
+
+        Encoding runs on a pool of self.workers threads; Pillow releases
+        the GIL while compressing, so independent artifacts are produced
+        concurrently. on_progress is
+        called as on_progress(step, total, status) and on_artifact as
+        on_artifact(artifact), both on the calling thread as each artifact
+        finishes, in completion order. If names is given only those
+        artifacts (and the images they need) are rendered. If cancel (a
+        threading.Event) is set, rendering stops at the next artifact
+        boundary and Cancelled is raised. The returned list keeps profile
+        order; with collect=False nothing is kept once on_artifact returns,
+        so encoded output never accumulates and an empty list is returned.
+
+        With fingerprinting, manifests are encoded after every icon so they
+        can refer to the icons' fingerprinted names; filenames supplies the
+        names of artifacts that are not re-rendered. self.asset_map and
+        self.html are updated to match.
+        """
+        selected = [(target, keys) for target, keys in self.graph.artifacts
+                    if names is None or target.name in names]
+        needed = [key for key in self.graph.nodes
+                  if any(key in keys for _, keys in selected)]
+        total = len(selected)
+        images = {}
+        if needed:
+            plan = RenderPlan(source, sorted({size for size, _ in needed}, reverse=True),
+                              self.recorder)
+
+            # Each (size, background) image is rendered once and shared;
+            # every size that needs the same background is flattened in one batch
+            fills = {}
+            for size, fill in needed:
+                if fill:
+                    fills.setdefault(fill, []).append(size)
+                else:
+                    images[(size, fill)] = plan.get(size)
+            for fill, sizes in fills.items():
+                with self.recorder.stage('flatten', fill):
+                    batch = flatten_batch([plan.premultiplied(size) for size in sizes], fill)
+                images.update({(size, fill): img for size, img in zip(sizes, batch)})
+
+        def build(target, keys):
+            if cancel is not None and cancel.is_set():
+                raise Cancelled()
+            return self._build(target, [images[key] for key in keys])
+
+        deferred = [(target, keys) for target, keys in selected
+                    if self.fingerprint and target.type == 'manifest']
+        self.asset_map = dict(filenames or {})
+        results = {}
+
+        def finish(current, artifact):
+            self.asset_map[artifact.name] = artifact.filename
+            if collect:
+                results[artifact.name] = artifact
+            if on_progress:
+                on_progress(current, total, f"Generated {artifact.name}")
+            if on_artifact:
+                on_artifact(artifact)
+
+        immediate = [(target, keys) for target, keys in selected
+                     if (target, keys) not in deferred]
+        if self.workers == 1:
+            # on the calling thread, so no stage overlaps another (see Recorder)
+            for current, (target, keys) in enumerate(immediate, 1):
+                finish(current, build(target, keys))
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = {pool.submit(build, target, keys): target
+                           for target, keys in immediate}
+
+                for current, future in enumerate(as_completed(list(futures)), 1):
+                    if cancel is not None and cancel.is_set():
+                        for pending in futures:
+                            pending.cancel()
+                        raise Cancelled()
+                    artifact = future.result()
+                    del futures[future]
+                    finish(current, artifact)
+
+        for current, (target, keys) in enumerate(deferred, total - len(deferred) + 1):
+            finish(current, build(target, keys))
+
+        if self.fingerprint:
+            self.html = build_html(self.profile, self.asset_map)
+        if not collect:
+            return []
+        return [results[target.name] for target, _ in selected]
+
+    def encode_options(self):
+        """Encoder settings that change output bytes for identical images."""
+        return {'optimize_png': self.optimize_png,
+                'png_tolerance': self.png_tolerance if self.optimize_png else 0,
+                'fingerprint': self.fingerprint,
+                'precompress': self.precompress,
+                'min_saving': self.min_saving if self.precompress else 0}
+
+    def artifact_keys(self, source_id):
+        """Cache key of every artifact for a source identity.
+
+        A key covers the source content (for image artifacts), the resolved
+        background of each frame, the target's profile entry and the
+        encoder version.
+        """
+        keys = {}
+        # manifests last: a fingerprinted one names its icons by their content
+        ordered = sorted(self.graph.artifacts, key=lambda item: item[0].type == 'manifest')
+        for target, nodes in ordered:
+            payload = {
+                'encoder': ENCODER_VERSION,
+                'pillow': PIL.__version__,
+                'target': target.spec,
+                'nodes': nodes,
+                'options': self.encode_options(),
+            }
+            if nodes:
+                payload['source'] = source_id
+            if target.type == 'manifest':
+                icons = manifest_icons(target, self.profile)
+                payload['icons'] = [icon.spec for icon in icons]
+                if self.fingerprint:
+                    payload['icon_keys'] = [keys[icon.name] for icon in icons]
+            keys[target.name] = hash_key(payload)
+        return keys
+
+    def stale_targets(self, output_path, source_id):
+        """Names of the artifacts in output_path that need re-rendering."""
+        cache = OutputCache(output_path)
+        keys = self.artifact_keys(source_id)
+        return [name for name, key in keys.items() if not cache.is_current(name, key)]
+
+    def generate(self, source, output_path, on_progress=None, source_id=None,
+                 force=False, cancel=None):
+        """Render the favicon set and write it into output_path.
+
+        With a source_id (see cache.hash_file) only artifacts whose inputs
+        changed since the last run are rendered, unless force is set; the
+        others are left as they are. Artifacts written before a cancel
+        stay recorded, so the next run only renders the rest. A finished
+        run also writes self.html as HTML_FILE. Returns the artifacts that
+        were written.
+        """
+        os.makedirs(output_path, exist_ok=True)
+        cache = OutputCache(output_path)
+        keys = self.artifact_keys(source_id) if source_id else {}
+        names = None
+        if source_id and not force:
+            names = {name for name, key in keys.items() if not cache.is_current(name, key)}
+
+        def write(artifact):
+            previous = cache.filename(artifact.name)
+            stale = [previous + ext for ext in cache.sidecars(artifact.name)]
+            with self.recorder.stage('write', artifact.name) as stage:
+                path = os.path.join(output_path, artifact.filename)
+                for name, data in [('', artifact.data)] + list(artifact.sidecars.items()):
+                    write_atomic(path + name, data)
+                    stage.bytes += len(data)
+            # a new fingerprint replaces the file written under the old one,
+            # and sidecars that are no longer worth keeping go too
+            if previous != artifact.filename:
+                stale.append(previous)
+            written = {artifact.filename + ext for ext in artifact.sidecars}
+            for name in stale:
+                if name not in written:
+                    try:
+                        os.remove(os.path.join(output_path, name))
+                    except OSError:
+                        pass
+            if source_id:
+                cache.record(artifact.name, keys[artifact.name], len(artifact.data),
+                             artifact.filename, artifact.sidecars)
+            else:
+                cache.forget(artifact.name)
+
+        try:
+            written = self.render(source, on_progress, on_artifact=write, names=names,
+                                  cancel=cancel, filenames=cache.filenames())
+        finally:
+            cache.save()
+            asset_map = os.path.join(output_path, ASSET_MAP_FILE)
+            if self.fingerprint:
+                write_atomic(asset_map, self.asset_map_json())
+            elif os.path.exists(asset_map):
+                os.remove(asset_map)
+        write_atomic(os.path.join(output_path, HTML_FILE), self.html_bytes())
+        return written
+
+    def generate_staged(self, source, output_path, keep=DEFAULT_KEEP, fsync=False, **kwargs):
+        """generate() into a staging folder that then replaces output_path atomically.
+
+        Readers of output_path never see a partial set: a failed or
+        cancelled run leaves it untouched, as does a run that writes
+        nothing. See staging.StagedOutput for keep and fsync.
+        """
+        with StagedOutput(output_path, keep, fsync) as staging:
+            written = self.generate(source, staging.path, **kwargs)
+            if not written:
+                staging.discard()
+        return written
+
+    def export(self, source, archive, on_progress=None, cancel=None):
+        """Render the set straight into an archive.ArchiveWriter.
+
+        Each artifact is written to the archive as soon as it is encoded
+        and then dropped, followed by HTML_FILE. Returns the number of
+        files added.
+        """
+        before = archive.count
+
+        def add(artifact):
+            with self.recorder.stage('archive', artifact.name) as stage:
+                archive.add_artifact(artifact)
+                for ext, data in artifact.sidecars.items():
+                    archive.add(artifact.filename + ext, data)
+                stage.bytes = len(artifact.data)
+
+        self.render(source, on_progress, on_artifact=add, cancel=cancel, collect=False)
+        if self.fingerprint:
+            archive.add(ASSET_MAP_FILE, self.asset_map_json())
+        archive.add(HTML_FILE, self.html_bytes())
+        return archive.count - before
+
+    def asset_map_json(self):
+        """The asset map: artifact name -> file name actually written.
+
+        Every file whose name differs from its artifact name carries a
+        content hash and can be served with an immutable, long cache
+        lifetime.
+        """
+        return json.dumps(dict(sorted(self.asset_map.items())), indent=2).encode('utf-8')
+
+    def html_bytes(self):
+        """self.html as the contents of HTML_FILE."""
+        return (self.html + "\n").encode('utf-8')
+
+    def _build(self, target, frames):
+        """Encode one target from its rendered frames into an Artifact."""
+        with self.recorder.stage('encode_' + target.type, target.name) as stage:
+            artifact = Artifact(target.name, b'')
+            artifact.data = self._encode_target(target, frames, artifact.info)
+            if self.fingerprint and target.fingerprint:
+                artifact.filename = fingerprinted_name(target.name, artifact.data)
+            stage.bytes = len(artifact.data)
+        if self.precompress and target.type in COMPRESSIBLE_TYPES:
+            with self.recorder.stage('precompress', target.name) as stage:
+                artifact.sidecars, artifact.info['sidecars'] = compress_sidecars(
+                    artifact.data, self.precompress, self.min_saving)
+                stage.bytes = sum(len(data) for data in artifact.sidecars.values())
+        return artifact
+
+    def _encode_target(self, target, frames, info):
+        if target.type == 'png':
+            if self.optimize_png:
+                data, info['png'] = optimize_png(frames[0], self.png_tolerance,
+                                                 workers=self.workers)
+                return data
+            return encode_image(frames[0], 'PNG')
+        if target.type == 'ico':
+            return build_ico(frames, target.png_min_size, self._encode_ico_png)
+        if target.type in VARIANT_FORMATS:
+            data, info['variant'] = encode_variant(frames[0], target.type, target.quality,
+                                                   target.max_bytes, target.max_ms)
+            return data
+        filenames = self.asset_map if self.fingerprint else None
+        manifest = json.dumps(build_manifest(target, self.profile, filenames), indent=2)
+        return manifest.encode('utf-8')
+
+    def _encode_ico_png(self, img):
+        if self.optimize_png:
+            return optimize_png(img, self.png_tolerance, workers=self.workers)[0]
+        return encode_image(img, 'PNG')
+
+
+def find_sources(paths):
+    """Expand files and directories into a sorted list of source images.
+
+    Size masters in a directory are not sources of their own when the
+    source they belong to is there too; they render as part of its set.
+    """
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            names = [name for name in sorted(os.listdir(path))
+                     if name.lower().endswith(IMAGE_EXTENSIONS)]
+            stems = {os.path.splitext(name)[0] for name in names}
+            for name in names:
+                match = MASTER_PATTERN.match(os.path.splitext(name)[0])
+                if not (match and match.group(1) in stems):
+                    sources.append(os.path.join(path, name))
+        else:
+            sources.append(path)
+    return sources
+
+
+def output_names(sources):
+    """A distinct output folder name for every source of a batch.
+
+    A source is named after its file stem where that is unique. Clashing
+    stems use the path relative to the sources' common folder instead
+    (brands/a/logo.png and brands/b/logo.png become a/logo and b/logo),
+    keeping the extension if that still clashes (logo.png and logo.jpg).
+    Names are compared case-insensitively, as some file systems do.
+    Raises ValueError if two sources would still write to one folder.
+    """
+    paths = [os.path.abspath(path) for path in sources]
+    root = os.path.commonpath([os.path.dirname(path) for path in paths]) if paths else ''
+
+    def clashing(names):
+        folded = [name.casefold() for name in names]
+        return {name for name, key in zip(names, folded) if folded.count(key) > 1}
+
+    names = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    for step in (lambda path: os.path.splitext(os.path.relpath(path, root))[0],
+                 lambda path: os.path.relpath(path, root)):
+        clashes = clashing(names)
+        names = [step(path) if name in clashes else name for path, name in zip(paths, names)]
+
+    # one set must not be written inside another's folder either
+    folders = sorted((name.casefold() + os.sep, name, source)
+                     for name, source in zip(names, sources))
+    for parent, child in zip(folders, folders[1:]):
+        if child[0].startswith(parent[0]):
+            raise ValueError(f"{parent[2]} and {child[2]} would share the output "
+                             f"folder {parent[1]!r}")
+    return dict(zip(sources, names))
+
+
+def master_paths(path):
+    """Size masters registered next to a source, smallest first.
+
+    For logo.png these are files such as logo@16.png and logo@64.png in
+    the same directory.
+    """
+    directory, name = os.path.split(path)
+    stem = os.path.splitext(name)[0]
+    try:
+        entries = os.listdir(directory or '.')
+    except OSError:
+        return []
+    found = []
+    for entry in entries:
+        entry_stem, ext = os.path.splitext(entry)
+        match = MASTER_PATTERN.match(entry_stem)
+        if match and match.group(1) == stem and ext.lower() in IMAGE_EXTENSIONS:
+            found.append((int(match.group(2)), os.path.join(directory, entry)))
+    return [master for _, master in sorted(found)]
+
+
+def master_source(path):
+    """The source a size master such as logo@16.png belongs to, or None."""
+    directory, name = os.path.split(path)
+    match = MASTER_PATTERN.match(os.path.splitext(name)[0])
+    if not match:
+        return None
+    try:
+        entries = sorted(os.listdir(directory or '.'))
+    except OSError:
+        return None
+    for entry in entries:
+        stem, ext = os.path.splitext(entry)
+        if stem == match.group(1) and ext.lower() in IMAGE_EXTENSIONS:
+            return os.path.join(directory, entry)
+    return None
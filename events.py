@@ -0,0 +1,107 @@
+"""
+Elsakr Favicon Generator - Event Bus
+Thread-safe progress and event channel drained by clients at a fixed rate.
+"""
+
+import threading
+from collections import deque
+
+# Drains per second for interactive consumers
+DEFAULT_FPS = 30
+
+# Kinds where only the newest event matters between two drains
+COALESCED_KINDS = frozenset({'progress'})
+
+
+class EventBus:
+    """Thread-safe channel between workers and one consumer.
+
+    Workers publish (kind, data) events from any thread; the consumer
+    drains them in batches at its own pace, e.g. once per frame on the
+    GUI thread. Consecutive events of a coalesced kind such as 'progress'
+    replace one another, so a burst of step updates costs one redraw,
+    while every other event is delivered, in order. on_wake is called
+    once each time the channel goes from empty to non-empty, so the
+    consumer can schedule a single drain instead of polling.
+    """
+
+    def __init__(self, on_wake=None):
+        self.on_wake = on_wake
+        self.published = 0
+        self.delivered = 0
+        self._events = deque()
+        self._lock = threading.Lock()
+
+    def publish(self, kind, **data):
+        with self._lock:
+            self.published += 1
+            if kind in COALESCED_KINDS and self._events and self._events[-1][0] == kind:
+                self._events[-1] = (kind, data)
+                return
+            self._events.append((kind, data))
+            wake = len(self._events) == 1
+        if wake and self.on_wake:
+            self.on_wake()
+
+    def progress(self, step, total, status=None):
+        """Publish step of total; matches the engine's on_progress signature."""
+        self.publish('progress', step=step, total=total, status=status)
+
+    def drain(self):
+        """Take every pending event, oldest first."""
+        with self._lock:
+            events, self._events = list(self._events), deque()
+            self.delivered += len(events)
+        return events
+
+
+def dispatch(events, target):
+    """Call target.on_<kind>(**data) for each drained event it handles."""
+    for kind, data in events:
+        handler = getattr(target, 'on_' + kind, None)
+        if handler is not None:
+            handler(**data)
+
+
+class Pump:
+    """Deliver a bus's events on a background thread, at most fps times a second.
+
+    The thread sleeps until something is published, waits out the rest of
+    the frame so a burst arrives as one batch, then hands the batch to
+    handler(events). stop() delivers whatever is still pending.
+    """
+
+    def __init__(self, bus, handler, fps=DEFAULT_FPS):
+        self.bus = bus
+        self.handler = handler
+        self.interval = 1.0 / fps
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        bus.on_wake = self._wake.set
+
+    def run(self):
+        while True:
+            self._wake.wait()
+            if self._stopped.wait(self.interval):
+                break
+            self._wake.clear()
+            self.handler(self.bus.drain())
+        self.handler(self.bus.drain())
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
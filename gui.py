@@ -0,0 +1,744 @@
+"""
+Elsakr Favicon Generator - Premium Edition
+Generate all favicon sizes from a single image.
+Modern Dark Theme with Premium UI
+"""
+
+import os
+import sys
+import tkinter as tk
+from tkinter import filedialog, messagebox
+from PIL import Image, ImageTk, ImageOps
+
+from engine import prepare_image
+from events import DEFAULT_FPS, dispatch
+from loader import peak_rss
+from session import AppSession
+
+
+class Colors:
+    """Premium dark theme colors."""
+    BG_DARK = "#0a0a0f"
+    BG_CARD = "#12121a"
+    BG_CARD_HOVER = "#1a1a25"
+    BG_INPUT = "#1e1e2e"
+    
+    PRIMARY = "#6366f1"  # Indigo
+    PRIMARY_HOVER = "#818cf8"
+    PRIMARY_DARK = "#4f46e5"
+    
+    SECONDARY = "#22d3ee"  # Cyan accent
+    SUCCESS = "#10b981"
+    WARNING = "#f59e0b"
+    ERROR = "#ef4444"
+    
+    TEXT_PRIMARY = "#ffffff"
+    TEXT_SECONDARY = "#a1a1aa"
+    TEXT_MUTED = "#71717a"
+    
+    BORDER = "#27272a"
+    BORDER_FOCUS = "#6366f1"
+    
+    GRADIENT_START = "#6366f1"
+    GRADIENT_END = "#8b5cf6"
+
+
+class PremiumButton(tk.Canvas):
+    """Custom premium button with gradient and hover effects."""
+    
+    def __init__(self, parent, text, command=None, width=200, height=45, 
+                 primary=True, icon=None, **kwargs):
+        super().__init__(parent, width=width, height=height, 
+                        bg=Colors.BG_CARD, highlightthickness=0, **kwargs)
+        
+        self.command = command
+        self.text = text
+        self.width = width
+        self.height = height
+        self.primary = primary
+        self.icon = icon
+        self.hovered = False
+        
+        # Items are created once; hover only recolors them
+        radius = 10
+        self.bg_item = self.create_rounded_rect(2, 2, self.width-2, self.height-2,
+                                                radius, outline="")
+        self.text_item = self.create_text(self.width//2, self.height//2,
+                                          text=self.text,
+                                          font=("Segoe UI Semibold", 11))
+        self.draw_button()
+        
+        self.bind("<Enter>", self.on_enter)
+        self.bind("<Leave>", self.on_leave)
+        self.bind("<Button-1>", self.on_click)
+        
+    def draw_button(self):
+        """Color the button for its current state."""
+        # Colors based on state and type
+        if self.primary:
+            if self.hovered:
+                bg_color = Colors.PRIMARY_HOVER
+            else:
+                bg_color = Colors.PRIMARY
+            text_color = Colors.TEXT_PRIMARY
+        else:
+            if self.hovered:
+                bg_color = Colors.BG_CARD_HOVER
+            else:
+                bg_color = Colors.BG_INPUT
+            text_color = Colors.TEXT_SECONDARY
+        
+        self.itemconfigure(self.bg_item, fill=bg_color)
+        self.itemconfigure(self.text_item, text=self.text, fill=text_color)
+        
+    def create_rounded_rect(self, x1, y1, x2, y2, radius, **kwargs):
+        """Create a rounded rectangle."""
+        points = [
+            x1+radius, y1,
+            x2-radius, y1,
+            x2, y1,
+            x2, y1+radius,
+            x2, y2-radius,
+            x2, y2,
+            x2-radius, y2,
+            x1+radius, y2,
+            x1, y2,
+            x1, y2-radius,
+            x1, y1+radius,
+            x1, y1,
+        ]
+        return self.create_polygon(points, smooth=True, **kwargs)
+        
+    def on_enter(self, event):
+        self.hovered = True
+        self.draw_button()
+        self.config(cursor="hand2")
+        
+    def on_leave(self, event):
+        self.hovered = False
+        self.draw_button()
+        
+    def on_click(self, event):
+        if self.command:
+            self.command()
+
+
+class PremiumCard(tk.Frame):
+    """Premium card container with subtle border."""
+    
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, bg=Colors.BG_CARD, **kwargs)
+        self.config(highlightbackground=Colors.BORDER, 
+                   highlightthickness=1)
+
+
+class DropZone(tk.Canvas):
+    """Drag and drop zone for images."""
+    
+    def __init__(self, parent, on_file_drop=None, width=300, height=250, **kwargs):
+        super().__init__(parent, width=width, height=height,
+                        bg=Colors.BG_INPUT, highlightthickness=2,
+                        highlightbackground=Colors.BORDER, **kwargs)
+        
+        self.on_file_drop = on_file_drop
+        self.width = width
+        self.height = height
+        self.has_image = False
+        self.photo = None
+        self.image_item = None
+        self.caption_item = None
+        
+        self.draw_empty_state()
+        
+        self.bind("<Button-1>", self.on_click)
+        
+    def draw_empty_state(self):
+        """Draw the empty drop zone state."""
+        self.delete("all")
+        self.has_image = False
+        
+        # Dashed border effect
+        dash_length = 10
+        
+        # Draw icon
+        self.create_text(self.width//2, self.height//2 - 40,
+                        text="🖼️", font=("Segoe UI", 48))
+        
+        # Draw text
+        self.create_text(self.width//2, self.height//2 + 30,
+                        text="Click to select image",
+                        fill=Colors.TEXT_SECONDARY,
+                        font=("Segoe UI", 12))
+        
+        self.create_text(self.width//2, self.height//2 + 55,
+                        text="PNG, JPG, WebP, BMP",
+                        fill=Colors.TEXT_MUTED,
+                        font=("Segoe UI", 10))
+        
+    def set_image(self, image, filename=""):
+        """Display the selected image, reusing the canvas items of the last one."""
+        if not self.has_image:
+            self.delete("all")
+            self.image_item = self.create_image(self.width // 2, (self.height - 30) // 2)
+            self.caption_item = self.create_text(self.width//2, self.height - 20,
+                                                 fill=Colors.TEXT_MUTED,
+                                                 font=("Segoe UI", 9))
+            self.has_image = True
+        
+        # Resize for preview
+        preview = ImageOps.contain(image, (self.width - 40, self.height - 60),
+                                   Image.Resampling.LANCZOS)
+        self.photo = ImageTk.PhotoImage(preview)
+        self.itemconfigure(self.image_item, image=self.photo)
+        
+        # Filename at bottom
+        self.itemconfigure(self.caption_item,
+                           text=filename[:30] + "..." if len(filename) > 30 else filename)
+        
+    def on_click(self, event):
+        """Handle click to select file."""
+        filetypes = [
+            ("Image files", "*.png *.jpg *.jpeg *.webp *.bmp"),
+            ("All files", "*.*")
+        ]
+        
+        path = filedialog.askopenfilename(
+            title="Select Source Image",
+            filetypes=filetypes
+        )
+        
+        if path and self.on_file_drop:
+            self.on_file_drop(path)
+
+
+class FaviconGenerator:
+    """Main application class for Premium Favicon Generator."""
+    
+    def __init__(self, root, source_path=None):
+        self.root = root
+        self.root.title("Elsakr Favicon Generator")
+        self.root.geometry("1250x850")
+        self.root.minsize(1000, 700)
+        self.root.configure(bg=Colors.BG_DARK)
+        
+        # Variables
+        self.bg_color = "#FFFFFF"
+        self.output_folder = None
+        self.preview_images = {}
+        self.logo_photo = None
+        # Source, previews and jobs; workers publish on session.events and
+        # the main thread drains it at most DEFAULT_FPS times a second
+        self.session = AppSession(on_wake=self._schedule_drain)
+        self.progress_value = None
+        
+        # Show the window right away; panels and assets follow one per
+        # event-loop turn so the window stays responsive while it fills in
+        self.main_frame = tk.Frame(self.root, bg=Colors.BG_DARK)
+        self.main_frame.pack(fill=tk.BOTH, expand=True, padx=30, pady=25)
+        self.create_header(self.main_frame)
+        self.build_steps = [self.create_content, self.load_logo, self.set_window_icon]
+        if source_path:
+            self.build_steps.append(lambda: self.load_image(source_path))
+        self.root.after_idle(self._build_next)
+        
+    def _schedule_drain(self):
+        """Called from any thread when the event bus stops being empty."""
+        self.root.after(1000 // DEFAULT_FPS, self._drain_events)
+
+    def _drain_events(self):
+        dispatch(self.session.events.drain(), self)
+
+    def on_progress(self, step, total, status=None):
+        self.update_progress(step * 100 / total if total else 0)
+        if status is not None:
+            self.status_label.config(text=status)
+
+    def on_previews(self, generation, previews):
+        # Only the newest request reaches the UI
+        if self.session.previews.is_current(generation):
+            self._show_previews(previews)
+
+    def on_html(self, html):
+        self._update_html(html)
+
+    def on_done(self, message, notify=True):
+        # watch runs only update the status line, which already says done
+        if notify:
+            messagebox.showinfo("Success", message)
+
+    def on_cancelled(self):
+        self.update_progress(0)
+        self.status_label.config(text="Cancelled")
+
+    def on_failed(self, message, notify=True):
+        if notify:
+            messagebox.showerror("Error", message)
+            self.status_label.config(text="Error")
+        else:
+            self.status_label.config(text=f"Error: {message}")
+
+    def on_source_changed(self):
+        self._on_source_changed()
+
+    def _build_next(self):
+        """Run the next deferred build step."""
+        if self.build_steps:
+            self.build_steps.pop(0)()
+            self.root.after_idle(self._build_next)
+            
+    def resource_path(self, relative_path):
+        """ Get absolute path to resource, works for dev and for PyInstaller """
+        try:
+            # PyInstaller creates a temp folder and stores path in _MEIPASS
+            base_path = sys._MEIPASS
+        except Exception:
+            base_path = os.path.abspath(".")
+
+        return os.path.join(base_path, relative_path)
+
+    def set_window_icon(self):
+        """Set the window icon."""
+        try:
+            icon_path = self.resource_path(os.path.join("assets", "fav.ico"))
+            if os.path.exists(icon_path):
+                self.root.iconbitmap(icon_path)
+        except:
+            pass
+            
+    def load_logo(self):
+        """Load the Elsakr logo into the header."""
+        try:
+            logo_path = self.resource_path(os.path.join("assets", "Sakr-logo.png"))
+            if os.path.exists(logo_path):
+                logo = Image.open(logo_path)
+                logo.thumbnail((45, 45), Image.Resampling.LANCZOS)
+                self.logo_photo = ImageTk.PhotoImage(logo)
+                logo_label = tk.Label(self.title_frame, image=self.logo_photo,
+                                      bg=Colors.BG_DARK)
+                logo_label.pack(side=tk.LEFT, padx=(0, 15), before=self.title_text)
+        except:
+            pass
+        
+    def create_content(self):
+        """Create the settings and preview panels."""
+        content = tk.Frame(self.main_frame, bg=Colors.BG_DARK)
+        content.pack(fill=tk.BOTH, expand=True, pady=(25, 0))
+        
+        # Left panel
+        self.create_left_panel(content)
+        
+        # Right panel
+        self.create_right_panel(content)
+        
+    def create_header(self, parent):
+        """Create the header section."""
+        header = tk.Frame(parent, bg=Colors.BG_DARK)
+        header.pack(fill=tk.X)
+        
+        # Logo (added once loaded) and title
+        title_frame = self.title_frame = tk.Frame(header, bg=Colors.BG_DARK)
+        title_frame.pack(side=tk.LEFT)
+        
+        title_text = self.title_text = tk.Frame(title_frame, bg=Colors.BG_DARK)
+        title_text.pack(side=tk.LEFT)
+        
+        tk.Label(title_text, text="Favicon Generator", 
+                font=("Segoe UI Bold", 24), fg=Colors.TEXT_PRIMARY,
+                bg=Colors.BG_DARK).pack(anchor=tk.W)
+        
+        tk.Label(title_text, text="Generate all favicon sizes from a single image",
+                font=("Segoe UI", 11), fg=Colors.TEXT_MUTED,
+                bg=Colors.BG_DARK).pack(anchor=tk.W)
+        
+        # Version badge
+        version_frame = tk.Frame(header, bg=Colors.BG_DARK)
+        version_frame.pack(side=tk.RIGHT)
+        
+        badge = tk.Label(version_frame, text=" v1.0 ", 
+                        font=("Segoe UI", 9), fg=Colors.PRIMARY,
+                        bg=Colors.BG_INPUT)
+        badge.pack()
+        
+    def create_left_panel(self, parent):
+        """Create the left panel with input controls."""
+        left = tk.Frame(parent, bg=Colors.BG_DARK, width=380)
+        left.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 20))
+        left.pack_propagate(False)
+        
+        # Source Image Card
+        source_card = PremiumCard(left, padx=20, pady=20)
+        source_card.pack(fill=tk.X, pady=(0, 15))
+        
+        tk.Label(source_card, text="📁 Source Image",
+                font=("Segoe UI Semibold", 13), fg=Colors.TEXT_PRIMARY,
+                bg=Colors.BG_CARD).pack(anchor=tk.W, pady=(0, 15))
+        
+        # Drop zone
+        self.drop_zone = DropZone(source_card, on_file_drop=self.load_image,
+                                  width=340, height=220)
+        self.drop_zone.pack()
+        
+        # Image info
+        self.image_info = tk.Label(source_card, text="No image selected",
+                                   font=("Segoe UI", 10), fg=Colors.TEXT_MUTED,
+                                   bg=Colors.BG_CARD)
+        self.image_info.pack(pady=(10, 0))
+        
+        # Settings Card
+        settings_card = PremiumCard(left, padx=20, pady=20)
+        settings_card.pack(fill=tk.X, pady=(0, 15))
+        
+        tk.Label(settings_card, text="⚙️ Settings",
+                font=("Segoe UI Semibold", 13), fg=Colors.TEXT_PRIMARY,
+                bg=Colors.BG_CARD).pack(anchor=tk.W, pady=(0, 15))
+        
+        # Background color
+        color_frame = tk.Frame(settings_card, bg=Colors.BG_CARD)
+        color_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        tk.Label(color_frame, text="Background Color (for transparent images)",
+                font=("Segoe UI", 10), fg=Colors.TEXT_SECONDARY,
+                bg=Colors.BG_CARD).pack(side=tk.LEFT)
+        
+        color_btn_frame = tk.Frame(color_frame, bg=Colors.BG_CARD)
+        color_btn_frame.pack(side=tk.RIGHT)
+        
+        self.color_preview = tk.Label(color_btn_frame, width=4, height=1,
+                                      bg=self.bg_color, relief='flat')
+        self.color_preview.pack(side=tk.LEFT, padx=(0, 8))
+        
+        color_btn = tk.Label(color_btn_frame, text="Choose", cursor="hand2",
+                            font=("Segoe UI", 9), fg=Colors.PRIMARY,
+                            bg=Colors.BG_CARD)
+        color_btn.pack(side=tk.LEFT)
+        color_btn.bind("<Button-1>", lambda e: self.choose_color())
+        
+        # Output folder
+        tk.Label(settings_card, text="Output Folder",
+                font=("Segoe UI", 10), fg=Colors.TEXT_SECONDARY,
+                bg=Colors.BG_CARD).pack(anchor=tk.W)
+        
+        folder_frame = tk.Frame(settings_card, bg=Colors.BG_CARD)
+        folder_frame.pack(fill=tk.X, pady=(8, 0))
+        
+        self.folder_entry = tk.Entry(folder_frame, font=("Segoe UI", 10),
+                                     bg=Colors.BG_INPUT, fg=Colors.TEXT_PRIMARY,
+                                     insertbackground=Colors.TEXT_PRIMARY,
+                                     relief='flat', highlightthickness=1,
+                                     highlightbackground=Colors.BORDER)
+        self.folder_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, ipady=8, padx=(0, 10))
+        
+        browse_btn = tk.Label(folder_frame, text="📂", cursor="hand2",
+                             font=("Segoe UI", 16), fg=Colors.TEXT_SECONDARY,
+                             bg=Colors.BG_CARD)
+        browse_btn.pack(side=tk.RIGHT)
+        browse_btn.bind("<Button-1>", lambda e: self.select_output_folder())
+        
+        # Generate button
+        self.generate_btn = PremiumButton(left, text="🚀  Generate Favicons",
+                                          command=self.generate_favicons,
+                                          width=340, height=50)
+        self.generate_btn.pack(pady=(15, 0))
+
+        export_btn = tk.Label(left, text="📦  Export as ZIP…", cursor="hand2",
+                              font=("Segoe UI", 10), fg=Colors.PRIMARY,
+                              bg=Colors.BG_DARK)
+        export_btn.pack(pady=(8, 0))
+        export_btn.bind("<Button-1>", lambda e: self.export_archive())
+
+        self.watch_btn = tk.Label(left, text="👁  Watch source: off", cursor="hand2",
+                                  font=("Segoe UI", 10), fg=Colors.TEXT_SECONDARY,
+                                  bg=Colors.BG_DARK)
+        self.watch_btn.pack(pady=(4, 0))
+        self.watch_btn.bind("<Button-1>", lambda e: self.toggle_watch())
+        
+        # Progress section
+        progress_frame = tk.Frame(left, bg=Colors.BG_DARK)
+        progress_frame.pack(fill=tk.X, pady=(15, 0))
+        
+        # Custom progress bar
+        self.progress_canvas = tk.Canvas(progress_frame, height=6, 
+                                          bg=Colors.BG_INPUT, highlightthickness=0)
+        self.progress_canvas.pack(fill=tk.X)
+        
+        status_row = tk.Frame(progress_frame, bg=Colors.BG_DARK)
+        status_row.pack(fill=tk.X, pady=(8, 0))
+        
+        self.status_label = tk.Label(status_row, text="Ready",
+                                     font=("Segoe UI", 10), fg=Colors.TEXT_MUTED,
+                                     bg=Colors.BG_DARK)
+        self.status_label.pack(side=tk.LEFT, expand=True)
+        
+        cancel_btn = tk.Label(status_row, text="Cancel", cursor="hand2",
+                              font=("Segoe UI", 9), fg=Colors.ERROR,
+                              bg=Colors.BG_DARK)
+        cancel_btn.pack(side=tk.RIGHT)
+        cancel_btn.bind("<Button-1>", lambda e: self.cancel_generation())
+        
+    def create_right_panel(self, parent):
+        """Create the right panel with previews."""
+        right = tk.Frame(parent, bg=Colors.BG_DARK)
+        right.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+        
+        # Preview Card
+        preview_card = PremiumCard(right, padx=25, pady=20)
+        preview_card.pack(fill=tk.BOTH, expand=True)
+        
+        tk.Label(preview_card, text="👁️ Preview - All Sizes",
+                font=("Segoe UI Semibold", 13), fg=Colors.TEXT_PRIMARY,
+                bg=Colors.BG_CARD).pack(anchor=tk.W, pady=(0, 20))
+        
+        # Preview grid
+        grid_frame = tk.Frame(preview_card, bg=Colors.BG_CARD)
+        grid_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.preview_slots = {}
+        sizes_info = [
+            ('favicon.ico', '16/32/48', 48),
+            ('favicon-16x16.png', '16×16', 16),
+            ('favicon-32x32.png', '32×32', 32),
+            ('apple-touch-icon.png', '180×180', 60),
+            ('android-chrome-192x192.png', '192×192', 70),
+            ('mstile-150x150.png', '150×150', 55),
+        ]
+        
+        for i, (name, size_text, display_size) in enumerate(sizes_info):
+            row = i // 3
+            col = i % 3
+            
+            slot = tk.Frame(grid_frame, bg=Colors.BG_INPUT, padx=15, pady=15)
+            slot.grid(row=row, column=col, padx=8, pady=8, sticky='nsew')
+            
+            # Preview image placeholder
+            img_frame = tk.Frame(slot, bg=Colors.BG_DARK, width=80, height=80)
+            img_frame.pack(pady=(0, 10))
+            img_frame.pack_propagate(False)
+            
+            img_label = tk.Label(img_frame, text="—", font=("Segoe UI", 20),
+                                fg=Colors.TEXT_MUTED, bg=Colors.BG_DARK)
+            img_label.pack(expand=True)
+            
+            # Size name
+            tk.Label(slot, text=name.replace('.png', '').replace('.ico', ''),
+                    font=("Segoe UI", 9), fg=Colors.TEXT_PRIMARY,
+                    bg=Colors.BG_INPUT).pack()
+            
+            tk.Label(slot, text=size_text,
+                    font=("Segoe UI", 8), fg=Colors.TEXT_MUTED,
+                    bg=Colors.BG_INPUT).pack()
+            
+            self.preview_slots[name] = (img_label, display_size)
+        
+        # Configure grid
+        for i in range(3):
+            grid_frame.columnconfigure(i, weight=1)
+        for i in range(2):
+            grid_frame.rowconfigure(i, weight=1)
+        
+        # HTML Code Card
+        html_card = PremiumCard(right, padx=25, pady=20)
+        html_card.pack(fill=tk.X, pady=(15, 0))
+        
+        header_row = tk.Frame(html_card, bg=Colors.BG_CARD)
+        header_row.pack(fill=tk.X, pady=(0, 10))
+        
+        tk.Label(header_row, text="📋 HTML Code Snippet",
+                font=("Segoe UI Semibold", 13), fg=Colors.TEXT_PRIMARY,
+                bg=Colors.BG_CARD).pack(side=tk.LEFT)
+        
+        copy_btn = tk.Label(header_row, text="Copy", cursor="hand2",
+                           font=("Segoe UI", 10), fg=Colors.PRIMARY,
+                           bg=Colors.BG_CARD)
+        copy_btn.pack(side=tk.RIGHT)
+        copy_btn.bind("<Button-1>", lambda e: self.copy_html())
+        
+        # HTML text area
+        self.html_text = tk.Text(html_card, height=5, font=("Consolas", 10),
+                                 bg=Colors.BG_INPUT, fg=Colors.TEXT_SECONDARY,
+                                 insertbackground=Colors.TEXT_PRIMARY,
+                                 relief='flat', wrap=tk.NONE,
+                                 highlightthickness=1,
+                                 highlightbackground=Colors.BORDER)
+        self.html_text.pack(fill=tk.X)
+        self.html_text.insert('1.0', '<!-- Generate favicons to see the HTML code -->')
+        self.html_text.config(state=tk.DISABLED)
+        
+    def load_image(self, path):
+        """Load and display the selected image."""
+        try:
+            source = self.session.load(path)
+            
+            # Update drop zone
+            filename = os.path.basename(path)
+            self.drop_zone.set_image(source.image, filename)
+            
+            # Update info
+            w, h = source.size
+            info = f"{w}×{h} px • {source.mode}"
+            if source.masters:
+                count = len(source.masters)
+                info += f" • +{count} size master{'s' if count > 1 else ''}"
+            peak = peak_rss()
+            if peak:
+                info += f" • peak {peak // 2 ** 20} MB"
+            self.image_info.config(text=info)
+            
+            # Update previews
+            self.update_previews()
+            
+            # Set default output folder
+            if not self.folder_entry.get():
+                self.folder_entry.insert(0, os.path.dirname(path))
+
+            # Follow the new file when watching
+            watcher = self.session.watcher
+            if watcher and os.path.abspath(path) not in watcher.watch_set.files:
+                self._start_watch(path)
+                
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load image:\n{str(e)}")
+            
+    def toggle_watch(self):
+        """Turn re-rendering on source changes on or off."""
+        if self.session.watcher:
+            self.session.unwatch()
+            self.watch_btn.config(text="👁  Watch source: off", fg=Colors.TEXT_SECONDARY)
+            return
+        if not self.session.source_path:
+            messagebox.showwarning("No Image", "Please select a source image first.")
+            return
+        self._start_watch(self.session.source_path)
+
+    def _start_watch(self, path):
+        watcher = self.session.watch(path)
+        self.watch_btn.config(text=f"👁  Watching ({watcher.backend.name})",
+                              fg=Colors.PRIMARY)
+
+    def _on_source_changed(self):
+        """Reload the changed source; previews, files and HTML follow."""
+        path = self.session.source_path
+        if not self.session.watcher or not os.path.isfile(path):
+            return
+        self.load_image(path)
+        if self.folder_entry.get():
+            self.generate_favicons(notify=False)
+
+    def update_previews(self):
+        """Request preview images; they are rendered off the main thread."""
+        self.session.request_previews(
+            {name: display_size for name, (_, display_size) in self.preview_slots.items()})
+        
+    def _show_previews(self, previews):
+        """Show rendered previews (runs on the Tk main thread)."""
+        for name, preview in previews.items():
+            label, _ = self.preview_slots[name]
+            photo = ImageTk.PhotoImage(preview)
+            self.preview_images[name] = photo
+            label.config(image=photo, text="")
+            
+    def prepare_image(self, img, size):
+        """Prepare image for a specific size."""
+        return prepare_image(img, size)
+        
+    def choose_color(self):
+        """Open color chooser."""
+        from tkinter import colorchooser
+        color = colorchooser.askcolor(color=self.bg_color, title="Choose Background Color")
+        if color[1]:
+            self.bg_color = color[1]
+            self.color_preview.config(bg=self.bg_color)
+            
+    def select_output_folder(self):
+        """Select output folder."""
+        folder = filedialog.askdirectory(title="Select Output Folder")
+        if folder:
+            self.folder_entry.delete(0, tk.END)
+            self.folder_entry.insert(0, folder)
+            
+    def update_progress(self, value):
+        """Update progress bar, moving the existing bar instead of redrawing it."""
+        width = self.progress_canvas.winfo_width()
+        fill_width = round(width * (value / 100))
+        if fill_width == self.progress_value:
+            return
+        self.progress_value = fill_width
+        
+        bar = self.progress_canvas.find_withtag("progress")
+        if not bar:
+            bar = self.progress_canvas.create_rectangle(
+                0, 0, 0, 6, fill=Colors.PRIMARY, outline="", tags="progress"
+            )
+        self.progress_canvas.coords(bar, 0, 0, fill_width, 6)
+        self.progress_canvas.itemconfigure(
+            bar, state=tk.NORMAL if fill_width > 0 else tk.HIDDEN)
+            
+    def generate_favicons(self, notify=True):
+        """Generate all favicon sizes; notify=False reports in the status line only."""
+        if not self.session.source_image:
+            messagebox.showwarning("No Image", "Please select a source image first.")
+            return
+            
+        output_folder = self.folder_entry.get()
+        if not output_folder:
+            messagebox.showwarning("No Folder", "Please select an output folder.")
+            return
+            
+        output_path = os.path.join(output_folder, "favicons")
+        os.makedirs(output_path, exist_ok=True)
+        
+        # Identical requests merge into the running job; changed ones replace it
+        return self.session.generate(output_path, self.bg_color, notify)
+        
+    def export_archive(self):
+        """Stream the favicon set into a zip or tar archive."""
+        if not self.session.source_image:
+            messagebox.showwarning("No Image", "Please select a source image first.")
+            return
+
+        path = filedialog.asksaveasfilename(
+            title="Export Favicons", defaultextension=".zip",
+            filetypes=[("Zip archive", "*.zip"), ("Tar archive", "*.tar.gz *.tgz *.tar")]
+        )
+        if not path:
+            return
+
+        return self.session.export(path, self.bg_color)
+
+    def cancel_generation(self):
+        """Cancel the running generate job."""
+        if self.session.cancel():
+            self.status_label.config(text="Cancelling...")
+        
+    def _update_html(self, html):
+        """Update HTML snippet."""
+        self.html_text.config(state=tk.NORMAL)
+        self.html_text.delete('1.0', tk.END)
+        self.html_text.insert('1.0', html)
+        self.html_text.config(state=tk.DISABLED)
+        
+    def copy_html(self):
+        """Copy HTML to clipboard."""
+        self.html_text.config(state=tk.NORMAL)
+        html = self.html_text.get('1.0', tk.END).strip()
+        self.html_text.config(state=tk.DISABLED)
+        
+        self.root.clipboard_clear()
+        self.root.clipboard_append(html)
+        
+        self.status_label.config(text="✓ Copied to clipboard!")
+        self.root.after(2000, lambda: self.status_label.config(text="Ready"))
+
+
+def main(source_path=None, startup_probe=False):
+    """Run the app; startup_probe quits as soon as the window is fully built."""
+    root = tk.Tk()
+    app = FaviconGenerator(root, source_path)
+    if startup_probe:
+        app.build_steps.append(root.quit)
+    root.mainloop()
+    if startup_probe:
+        root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Elsakr Favicon Generator - ICO Writer
+Assemble favicon.ico from already-rendered frames.
+"""
+
+import struct
+
+from encoding import encode_image
+
+# Entries at least this large are stored PNG-compressed (Windows Vista+ and
+# every current browser); smaller ones stay uncompressed BMP, which is
+# smaller than PNG at those sizes and readable everywhere
+PNG_MIN_SIZE = 64
+
+MAX_SIZE = 256
+
+ICONDIR = struct.Struct('<HHH')
+ICONDIRENTRY = struct.Struct('<BBBBHHII')
+BITMAPINFOHEADER = struct.Struct('<IiiHHIIiiII')
+
+
+def encode_png(img):
+    """Default encoder for PNG-compressed entries."""
+    return encode_image(img, 'PNG')
+
+
+def _pad_rows(data, row_bytes, stride):
+    """Pad each row of data from row_bytes to stride bytes."""
+    if row_bytes == stride:
+        return data
+    padding = b'\0' * (stride - row_bytes)
+    return b''.join(data[i:i + row_bytes] + padding
+                    for i in range(0, len(data), row_bytes))
+
+
+def encode_bmp(img):
+    """Encode img as an ICO bitmap entry (header, XOR bitmap, AND mask).
+
+    Opaque images are stored as 24-bit BGR, images with alpha as 32-bit
+    BGRA; rows are bottom-up and padded to 4 bytes. The AND mask marks
+    fully transparent pixels for readers that ignore the alpha channel.
+    """
+    width, height = img.size
+    has_alpha = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+    if has_alpha:
+        img = img.convert('RGBA')
+        bits, rawmode = 32, 'BGRA'
+    else:
+        img = img.convert('RGB')
+        bits, rawmode = 24, 'BGR'
+
+    row_bytes = width * bits // 8
+    pixels = _pad_rows(img.tobytes('raw', rawmode, 0, -1), row_bytes,
+                       (row_bytes + 3) // 4 * 4)
+
+    mask_stride = (width + 31) // 32 * 4
+    if has_alpha:
+        mask = img.getchannel('A').point(lambda a: 255 if a == 0 else 0).convert('1')
+        mask = _pad_rows(mask.tobytes('raw', '1', 0, -1), (width + 7) // 8, mask_stride)
+    else:
+        mask = b'\0' * (mask_stride * height)
+
+    header = BITMAPINFOHEADER.pack(
+        BITMAPINFOHEADER.size, width, height * 2, 1, bits, 0,
+        len(pixels) + len(mask), 0, 0, 0, 0)
+    return header + pixels + mask
+
+
+def build_ico(frames, png_min_size=PNG_MIN_SIZE, png_encoder=encode_png):
+    """Assemble an ICO file from frames, one entry per frame.
+
+    Frames are written as given (no resampling), largest entries
+    PNG-compressed by png_encoder and smaller ones as BMP.
+    """
+    entries = []
+    for img in sorted(frames, key=lambda frame: frame.size):
+        width, height = img.size
+        if width > MAX_SIZE or height > MAX_SIZE:
+            raise ValueError(f"ICO entries are at most {MAX_SIZE} px, got {width}x{height}")
+        if max(width, height) >= png_min_size:
+            data, bits = png_encoder(img), 32
+        else:
+            data = encode_bmp(img)
+            bits = BITMAPINFOHEADER.unpack_from(data)[4]
+        entries.append((width, height, bits, data))
+
+    out = [ICONDIR.pack(0, 1, len(entries))]
+    offset = ICONDIR.size + ICONDIRENTRY.size * len(entries)
+    for width, height, bits, data in entries:
+        # a width or height of 0 means 256
+        out.append(ICONDIRENTRY.pack(width % 256, height % 256, 0, 0, 1, bits,
+                                     len(data), offset))
+        offset += len(data)
+    out.extend(data for _, _, _, data in entries)
+    return b''.join(out)
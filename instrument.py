@@ -0,0 +1,142 @@
+"""
+Elsakr Favicon Generator - Instrumentation
+Opt-in per-stage timing and memory recording for the generation pipeline.
+"""
+
+import os
+import json
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+
+class Stage:
+    """A recorded pipeline stage; code inside the stage may set .bytes."""
+
+    def __init__(self, name, artifact=None):
+        self.name = name
+        self.artifact = artifact
+        self.bytes = 0
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, {self.artifact!r})"
+
+
+class Recorder:
+    """Collect wall time, CPU time, bytes and peak memory for each stage.
+
+    CPU time is the stage thread's own time. With track_memory, memory is
+    the peak of Python-level allocations traced while the stage ran; it is
+    off by default because of what it costs. tracemalloc keeps
+    one peak per process and each stage resets it, so stages must not
+    run concurrently while memory is tracked: FaviconEngine renders on a
+    single thread when given such a recorder. Pixel buffers are allocated
+    by Pillow outside tracemalloc and show up in peak RSS instead.
+    """
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.events = []
+        self._lock = threading.Lock()
+        if track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name, artifact=None):
+        """Record the enclosed block as one stage."""
+        record = Stage(name, artifact)
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield record
+        finally:
+            event = {
+                'stage': name,
+                'artifact': artifact,
+                # perf_counter is system-wide, so events from worker processes line up
+                'start': wall,
+                'wall': time.perf_counter() - wall,
+                'cpu': time.thread_time() - cpu,
+                'bytes': record.bytes,
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+            }
+            if self.track_memory:
+                event['peak_alloc'] = max(0, tracemalloc.get_traced_memory()[1] - base)
+            with self._lock:
+                self.events.append(event)
+
+    def extend(self, events):
+        """Merge events recorded elsewhere (e.g. in a worker process)."""
+        with self._lock:
+            self.events.extend(events)
+
+    def totals(self):
+        """Per-stage sums of wall, CPU, bytes and the largest peak."""
+        totals = {}
+        for event in self.events:
+            total = totals.setdefault(event['stage'], {
+                'count': 0, 'wall': 0.0, 'cpu': 0.0, 'bytes': 0, 'peak_alloc': 0})
+            total['count'] += 1
+            total['wall'] += event['wall']
+            total['cpu'] += event['cpu']
+            total['bytes'] += event['bytes']
+            total['peak_alloc'] = max(total['peak_alloc'], event.get('peak_alloc', 0))
+        return totals
+
+    def to_json(self):
+        """Stage totals plus every individual event."""
+        return {'stages': self.totals(), 'events': self.events}
+
+    def chrome_trace(self):
+        """Events in Chrome trace-event format (chrome://tracing, Perfetto)."""
+        trace = []
+        origin = min((event['start'] for event in self.events), default=0)
+        for event in self.events:
+            name = event['stage']
+            if event['artifact']:
+                name += f" {event['artifact']}"
+            args = {'cpu_ms': round(event['cpu'] * 1000, 3), 'bytes': event['bytes']}
+            if 'peak_alloc' in event:
+                args['peak_alloc'] = event['peak_alloc']
+            trace.append({
+                'name': name, 'cat': event['stage'], 'ph': 'X',
+                'ts': round((event['start'] - origin) * 1e6, 1),
+                'dur': round(event['wall'] * 1e6, 1),
+                'pid': event['pid'], 'tid': event['tid'], 'args': args,
+            })
+        return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+    def save_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_json(), f, indent=2)
+
+    def save_trace(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+
+    def summary(self, top=3):
+        """One-line summary of the slowest stages."""
+        totals = self.totals()
+        if not totals:
+            return ""
+        slowest = sorted(totals.items(), key=lambda item: item[1]['wall'], reverse=True)
+        parts = [f"{name} {total['wall']:.2f}s" for name, total in slowest[:top]]
+        return " · ".join(parts)
+
+
+class NullRecorder:
+    """Recorder stand-in that records nothing."""
+
+    events = ()
+
+    @contextmanager
+    def stage(self, name, artifact=None):
+        yield Stage(name, artifact)
+
+
+NULL_RECORDER = NullRecorder()
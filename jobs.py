@@ -0,0 +1,114 @@
+"""
+Elsakr Favicon Generator - Job Scheduler
+Single-queue execution of generate requests with coalescing and cancellation.
+"""
+
+import threading
+
+from engine import Cancelled
+
+
+class Job:
+    """One queued or running generate request."""
+
+    def __init__(self, key, fn):
+        self.key = key
+        self.fn = fn
+        self.cancel_event = threading.Event()
+        self.result = None
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def wait(self, timeout=None):
+        """Block until the job finished or was cancelled."""
+        return self._done.wait(timeout)
+
+    def _finish(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self._done.set()
+
+    def __repr__(self):
+        state = "done" if self.done else "cancelled" if self.cancelled else "active"
+        return f"Job({self.key!r}, {state})"
+
+
+class JobScheduler:
+    """Run generate requests one at a time on a single worker thread.
+
+    A request whose key equals the running or queued job's key merges into
+    that job instead of starting another. A request with a different key
+    cancels the running job, which stops at its next artifact boundary,
+    and replaces any queued one, so at most one job is running and one is
+    waiting at any time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Condition()
+        self._current = None
+        self._pending = None
+        self._thread = None
+
+    def submit(self, key, fn):
+        """Queue fn(cancel_event) under key and return its Job."""
+        with self._lock:
+            for job in (self._pending, self._current):
+                if job is not None and job.key == key and not job.cancelled:
+                    return job
+
+            if self._current is not None:
+                self._current.cancel()
+            if self._pending is not None:
+                self._pending.cancel()
+                self._pending._finish(error=Cancelled())
+
+            self._pending = Job(key, fn)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._lock.notify()
+            return self._pending
+
+    def cancel(self):
+        """Cancel the running job and drop the queued one."""
+        with self._lock:
+            if self._current is not None:
+                self._current.cancel()
+            if self._pending is not None:
+                self._pending.cancel()
+                self._pending._finish(error=Cancelled())
+                self._pending = None
+
+    @property
+    def busy(self):
+        with self._lock:
+            return self._current is not None or self._pending is not None
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while self._pending is None:
+                    self._lock.wait()
+                job = self._current = self._pending
+                self._pending = None
+
+            try:
+                if job.cancelled:
+                    raise Cancelled()
+                job._finish(result=job.fn(job.cancel_event))
+            except Exception as e:
+                job._finish(error=e)
+            finally:
+                with self._lock:
+                    self._current = None
@@ -0,0 +1,233 @@
+"""
+Elsakr Favicon Generator - Source Loading
+Bounded-memory decoding of source images into a working-resolution master.
+"""
+
+import os
+import sys
+import struct
+from PIL import Image, UnidentifiedImageError
+
+from instrument import NULL_RECORDER
+
+
+# Twice the largest size we output, so the last resample still has detail to work with
+WORKING_SIZE = 1024
+
+# Refuse sources whose decoded pixels would need more than this (bytes)
+DEFAULT_MEMORY_LIMIT = 2 * 1024 ** 3
+
+# Rows converted to RGBA at a time while downsampling
+STRIP_ROWS = 512
+
+# Ceiling on the pixels decoded from a source, even with the memory check
+# disabled; replaces Pillow's decompression bomb limit (about 179 MP), which
+# would refuse large sources before draft decoding can shrink them
+MAX_SOURCE_PIXELS = 32768 * 32768
+
+
+class SourceTooLarge(ValueError):
+    """The decoded source would exceed the configured memory ceiling."""
+
+
+class LoadedSource:
+    """A working-resolution RGBA master plus facts about the original file."""
+
+    def __init__(self, image, path, size, mode, format, masters=()):
+        self.image = image
+        self.path = path
+        self.size = size
+        self.mode = mode
+        self.format = format
+        self.masters = list(masters)
+
+    @property
+    def images(self):
+        """What to render: the image alone, or the source set with its size masters."""
+        return [self.image] + self.masters if self.masters else self.image
+
+    def __repr__(self):
+        return (f"LoadedSource({self.path!r}, {self.size[0]}x{self.size[1]} "
+                f"{self.mode} -> {self.image.size[0]}x{self.image.size[1]})")
+
+
+def working_size_for(sizes):
+    """Working resolution for a set of output sizes."""
+    largest = max((size[0] for size in sizes), default=0)
+    return max(WORKING_SIZE, largest * 2)
+
+
+def decoded_bytes(size, mode):
+    """Estimate the memory Pillow needs to hold an image decoded."""
+    try:
+        bands = Image.getmodebands(mode)
+    except (KeyError, ValueError):
+        bands = 4
+    return size[0] * size[1] * bands
+
+
+def open_image(path):
+    """Open a path or binary file lazily, like Image.open minus the bomb check.
+
+    Pillow checks the size in the file header, before a JPEG draft can
+    shrink it; load_source checks the size it actually decodes instead.
+    """
+    if hasattr(path, 'read'):
+        prefix = path.read(16)
+    else:
+        with open(path, 'rb') as f:
+            prefix = f.read(16)
+    # the common plugins first, every plugin only when they do not match
+    for register in (Image.preinit, Image.init):
+        register()
+        for format in Image.ID:
+            factory, accept = Image.OPEN[format]
+            result = not accept or accept(prefix)
+            if not result or isinstance(result, str):
+                continue
+            if hasattr(path, 'read'):
+                path.seek(0)
+            try:
+                return factory(path)
+            except (SyntaxError, IndexError, TypeError, struct.error):
+                continue
+    raise UnidentifiedImageError(f"cannot identify image file {path!r}")
+
+
+def load_source(path, working_size=WORKING_SIZE, memory_limit=DEFAULT_MEMORY_LIMIT,
+                recorder=NULL_RECORDER):
+    """Decode path into an RGBA master no larger than working_size.
+
+    JPEGs are decoded through draft mode at the smallest DCT scale that is
+    still large enough. Everything else is converted to RGBA and box-reduced
+    a strip at a time, so no full-resolution RGBA copy ever exists. The
+    decoded original is released before returning.
+
+    Instead of Pillow's decompression bomb check on the header size, the
+    pixels actually decoded (after the JPEG draft) are held to
+    MAX_SOURCE_PIXELS, even with memory_limit 0; sources above it raise
+    SourceTooLarge like the memory check.
+    """
+    with open_image(path) as im:
+        size, mode, format = im.size, im.mode, im.format
+        scale = working_size / max(size)
+
+        if im.format == 'JPEG' and scale < 1:
+            im.draft(None, (int(size[0] * scale) + 1, int(size[1] * scale) + 1))
+
+        if im.size[0] * im.size[1] > MAX_SOURCE_PIXELS:
+            decoded = f" (decoded at {im.size[0]}×{im.size[1]})" if im.size != size else ""
+            raise SourceTooLarge(
+                f"{size[0]}×{size[1]}{decoded} exceeds the "
+                f"{MAX_SOURCE_PIXELS // 10 ** 6} megapixel limit for sources")
+
+        if memory_limit and decoded_bytes(im.size, im.mode) > memory_limit:
+            raise SourceTooLarge(
+                f"{size[0]}×{size[1]} {mode} needs about "
+                f"{decoded_bytes(im.size, im.mode) // 2 ** 20} MB to decode "
+                f"(limit {memory_limit // 2 ** 20} MB)")
+
+        with recorder.stage('decode', path):
+            im.load()
+        with recorder.stage('downsample', path):
+            master = downsample(im, working_size)
+
+    return LoadedSource(master, path, size, mode, format)
+
+
+def load_source_set(path, masters=(), working_size=WORKING_SIZE,
+                    memory_limit=DEFAULT_MEMORY_LIMIT, recorder=NULL_RECORDER):
+    """Load a source plus the hand-made size masters registered for it."""
+    source = load_source(path, working_size, memory_limit, recorder)
+    source.masters = [load_source(master, working_size, memory_limit, recorder).image
+                      for master in masters]
+    return source
+
+
+def downsample(im, working_size):
+    """Convert to RGBA and shrink so the long side is at most working_size."""
+    factor = max(1, max(im.size) // working_size)
+    if factor == 1 and max(im.size) <= working_size:
+        return im.convert('RGBA')
+
+    # Integer box reduction strip by strip, in premultiplied alpha so
+    # transparent pixels do not bleed dark fringes into the edges
+    width, height = im.size
+    reduced = Image.new('RGBa', (-(-width // factor), -(-height // factor)))
+    step = max(1, STRIP_ROWS // factor) * factor
+    for top in range(0, height, step):
+        strip = im.crop((0, top, width, min(top + step, height)))
+        strip = strip.convert('RGBA').convert('RGBa').reduce(factor)
+        reduced.paste(strip, (0, top // factor))
+        del strip
+
+    if max(reduced.size) > working_size:
+        scale = working_size / max(reduced.size)
+        target = (max(1, round(reduced.size[0] * scale)),
+                  max(1, round(reduced.size[1] * scale)))
+        reduced = reduced.resize(target, Image.Resampling.LANCZOS)
+    return reduced.convert('RGBA')
+
+
+def _process_counters():
+    """PROCESS_MEMORY_COUNTERS of this process on Windows, or None."""
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD),
+                        ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t),
+                        ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t),
+                        ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(
+                process, ctypes.byref(counters), counters.cb):
+            return counters
+    except Exception:
+        pass
+    return None
+
+
+def peak_rss(children=False):
+    """Peak resident set size of this process in bytes, or None if unknown.
+
+    With children=True, report the largest terminated child process instead
+    (not available on Windows).
+    """
+    if sys.platform == 'win32':
+        if children:
+            return None
+        counters = _process_counters()
+        return counters.PeakWorkingSetSize if counters else None
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def current_rss():
+    """Resident set size of this process right now in bytes, or None if unknown."""
+    if sys.platform == 'win32':
+        counters = _process_counters()
+        return counters.WorkingSetSize if counters else None
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # no procfs (macOS, BSD)
+        return None
@@ -0,0 +1,328 @@
+"""
+Elsakr Favicon Generator - Job Matrix
+Render sources × background colors × profiles from shared-memory masters.
+
+    python matrix.py brands/ -o build --bg "#FFFFFF" --bg "#000000" -p default -p extended
+    python matrix.py --matrix brands.json -o build
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from PIL import Image
+
+from cache import source_set_id
+from engine import (FaviconEngine, default_workers, find_sources, master_paths,
+                    output_names, square_image)
+from loader import DEFAULT_MEMORY_LIMIT, load_source_set, peak_rss, working_size_for
+from output_profile import DEFAULT_PROFILE, load_profile
+from staging import DEFAULT_KEEP
+
+REPORT_FILE = "matrix-report.json"
+
+
+class SharedMaster:
+    """A squared RGBA master held in a shared memory block.
+
+    Workers attach by name and wrap the block as an image without copying
+    or unpickling any pixel data. The creating process unlinks the block
+    once every job using it has finished. The source's small hand-made
+    size masters, if any, ride along as extras.
+    """
+
+    def __init__(self, image, extras=()):
+        data = image.tobytes()
+        self.extras = list(extras)
+        self.size = image.size
+        self.shm = shared_memory.SharedMemory(create=True, size=len(data))
+        self.shm.buf[:len(data)] = data
+
+    @property
+    def ref(self):
+        """Picklable handle passed to workers."""
+        return (self.shm.name, self.size)
+
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def attach(ref):
+    """(image, shared memory) for a SharedMaster.ref in a worker process."""
+    name, size = ref
+    shm = shared_memory.SharedMemory(name=name)
+    image = Image.frombuffer('RGBA', size, shm.buf, 'raw', 'RGBA', 0, 1)
+    return image, shm
+
+
+def variant_name(profile, bg_color):
+    """Folder name of one profile/background variant, e.g. default-ffffff."""
+    name = os.path.splitext(os.path.basename(profile or DEFAULT_PROFILE))[0]
+    return f"{name}-{bg_color.lstrip('#').lower()}"
+
+
+def render_job(ref, masters, source_id, output_path, job):
+    """Render one matrix cell from a shared master (runs in a worker process).
+
+    masters holds the source's hand-made size masters; they are small, so
+    they travel with the job instead of through shared memory.
+    """
+    start = time.perf_counter()
+    image, shm = attach(ref)
+    source = None
+    try:
+        engine = FaviconEngine(bg_color=job['bg'], profile=load_profile(job['profile']),
+                               workers=job['threads'], keep_alpha=job['keep_alpha'],
+                               fingerprint=job['fingerprint'])
+        source = [image] + masters if masters else image
+        if job['atomic']:
+            written = engine.generate_staged(source, output_path, keep=job['keep_sets'],
+                                             fsync=job['fsync'], source_id=source_id,
+                                             force=job['force'])
+        else:
+            written = engine.generate(source, output_path, source_id=source_id,
+                                      force=job['force'])
+        total = engine.total_steps()
+    except BaseException as e:
+        # frames kept by the traceback would hold on to the image view too
+        traceback.clear_frames(e.__traceback__)
+        raise
+    finally:
+        # every reference to the image view must go before the block can be closed
+        source = image = None
+        shm.close()
+    return {'written': len(written), 'skipped': total - len(written),
+            'seconds': time.perf_counter() - start, 'peak_rss': peak_rss()}
+
+
+class MatrixRunner:
+    """Run every source × background × profile job, collecting each outcome.
+
+    Each source is decoded and squared once in this process, at the
+    largest working size any profile needs, and shared with the pool.
+    Decoding the next source overlaps with rendering the previous ones; at
+    most max_masters masters are alive at a time. A source that fails to
+    decode, or a job that fails to render, is recorded and the batch
+    carries on. Brand folders are named by output_names, which raises
+    ValueError up front if two sources would share one.
+    """
+
+    def __init__(self, sources, backgrounds, profiles, output_root, jobs=None,
+                 threads=1, keep_alpha=False, force=False, fingerprint=False,
+                 atomic=False, keep_sets=DEFAULT_KEEP, fsync=False,
+                 memory_limit=DEFAULT_MEMORY_LIMIT, log=print):
+        self.sources = sources
+        self.backgrounds = backgrounds
+        self.profiles = profiles
+        self.output_root = output_root
+        self.jobs = jobs or default_workers()
+        self.max_masters = self.jobs + 1
+        self.options = {'threads': threads, 'keep_alpha': keep_alpha, 'force': force,
+                        'fingerprint': fingerprint, 'atomic': atomic,
+                        'keep_sets': keep_sets, 'fsync': fsync}
+        self.memory_limit = memory_limit
+        self.log = log
+        self.results = []
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(self.max_masters)
+        self.brands = output_names(sources)
+        self.engines = {(profile, bg_color): FaviconEngine(
+                            bg_color=bg_color, profile=load_profile(profile),
+                            keep_alpha=keep_alpha, fingerprint=fingerprint)
+                        for profile in profiles for bg_color in backgrounds}
+        self.working_size = max(working_size_for(engine.render_sizes())
+                                for engine in self.engines.values())
+
+    def brand_dir(self, path):
+        return os.path.join(self.output_root, self.brands[path])
+
+    def is_current(self, path, source_id):
+        """True if every variant of a source is already up to date on disk."""
+        return not self.options['force'] and not any(
+            self.engines[job['profile'], job['bg']].stale_targets(job['output'], source_id)
+            for job in self.cells(path))
+
+    def cells(self, path):
+        for profile in self.profiles:
+            for bg_color in self.backgrounds:
+                yield {'source': path, 'profile': profile, 'bg': bg_color,
+                       'output': os.path.join(self.brand_dir(path),
+                                              variant_name(profile, bg_color)),
+                       **self.options}
+
+    def up_to_date(self, job):
+        total = self.engines[job['profile'], job['bg']].total_steps()
+        return {'written': 0, 'skipped': total, 'seconds': 0.0, 'peak_rss': 0}
+
+    def record(self, job, result=None, error=None):
+        entry = {key: job[key] for key in ('source', 'profile', 'bg', 'output')}
+        if error is not None:
+            entry['error'] = error
+            self.log(f"✗ {job['source']} [{variant_name(job['profile'], job['bg'])}]: {error}")
+        else:
+            entry.update(result)
+            self.log(f"✓ {job['source']} [{variant_name(job['profile'], job['bg'])}] "
+                     f"{result['written']} written, {result['skipped']} up to date")
+        with self._lock:
+            self.results.append(entry)
+
+    def run(self):
+        """Run the whole matrix and return the per-job results."""
+        with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+            pending = []
+            for path in self.sources:
+                try:
+                    masters = master_paths(path)
+                    source_id = source_set_id([path] + masters, self.working_size)
+                    master = None
+                    if not self.is_current(path, source_id):
+                        master = self.load_master(path, masters)
+                except Exception as e:
+                    for job in self.cells(path):
+                        self.record(job, error=f"cannot load source: {e}")
+                    continue
+                if master is None:
+                    for job in self.cells(path):
+                        self.record(job, self.up_to_date(job))
+                    continue
+                pending += self.submit(pool, master, source_id, path)
+            for future in pending:
+                future.exception()
+        return self.results
+
+    def load_master(self, path, masters=()):
+        """Decode and square a source into shared memory, once a slot is free."""
+        self._slots.acquire()
+        try:
+            loaded = load_source_set(path, masters, self.working_size, self.memory_limit)
+            return SharedMaster(square_image(loaded.image), loaded.masters)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def submit(self, pool, master, source_id, path):
+        jobs = list(self.cells(path))
+        remaining = [len(jobs)]
+
+        def done(future, job):
+            try:
+                error = future.exception()
+                if error is None:
+                    self.record(job, future.result())
+                else:
+                    self.record(job, error=str(error) or type(error).__name__)
+            finally:
+                # the master must be released even if reporting fails
+                with self._lock:
+                    remaining[0] -= 1
+                    finished = not remaining[0]
+                if finished:
+                    master.release()
+                    self._slots.release()
+
+        futures = []
+        for job in jobs:
+            future = pool.submit(render_job, master.ref, master.extras, source_id,
+                                 job['output'], job)
+            future.add_done_callback(lambda f, job=job: done(f, job))
+            futures.append(future)
+        return futures
+
+
+def load_matrix(path):
+    """sources, backgrounds and profiles from a JSON matrix file."""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return (data.get('sources', []), data.get('backgrounds', ['#FFFFFF']),
+            data.get('profiles', [DEFAULT_PROFILE]))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="favicon-matrix",
+        description="Render every source for every background color and profile."
+    )
+    parser.add_argument("sources", nargs="*",
+                        help="source images or directories containing images (one brand each)")
+    parser.add_argument("--matrix", metavar="FILE",
+                        help='JSON file with "sources", "backgrounds" and "profiles" lists')
+    parser.add_argument("-o", "--output", default=".",
+                        help="output root; each brand gets <brand>/<profile>-<color>/")
+    parser.add_argument("--bg", action="append",
+                        help="background color (repeatable, default: #FFFFFF)")
+    parser.add_argument("-p", "--profile", action="append",
+                        help="output profile (repeatable, default: %s)" % DEFAULT_PROFILE)
+    parser.add_argument("--keep-alpha", action="store_true",
+                        help="keep transparency instead of flattening onto the background")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="content-hashed file names plus an asset map per variant")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--memory-limit", type=int, default=DEFAULT_MEMORY_LIMIT // 2 ** 20,
+                        metavar="MB", help="refuse sources that need more than this to "
+                                           "decode (default: %(default)s MB)")
+    parser.add_argument("--force", action="store_true",
+                        help="re-render every artifact even if it is up to date")
+    parser.add_argument("--atomic", action="store_true",
+                        help="build each variant in a staging folder and swap it into place")
+    parser.add_argument("--keep-sets", type=int, default=DEFAULT_KEEP, metavar="N",
+                        help="with --atomic, keep the N previous sets of each variant "
+                             "(default: %(default)s)")
+    parser.add_argument("--fsync", action="store_true",
+                        help="with --atomic, flush each staged set to disk before the swap")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    sources, backgrounds, profiles = list(args.sources), args.bg, args.profile
+    if args.matrix:
+        file_sources, file_backgrounds, file_profiles = load_matrix(args.matrix)
+        sources += file_sources
+        backgrounds = backgrounds or file_backgrounds
+        profiles = profiles or file_profiles
+    backgrounds = backgrounds or ['#FFFFFF']
+    profiles = profiles or [DEFAULT_PROFILE]
+
+    sources = find_sources(sources)
+    if not sources:
+        print("No source images found.", file=sys.stderr)
+        return 2
+    try:
+        for profile in profiles:
+            load_profile(profile)
+    except (OSError, ValueError) as e:
+        print(f"Invalid profile: {e}", file=sys.stderr)
+        return 2
+
+    try:
+        runner = MatrixRunner(sources, backgrounds, profiles, args.output, jobs=args.jobs,
+                              keep_alpha=args.keep_alpha, force=args.force,
+                              fingerprint=args.fingerprint, atomic=args.atomic,
+                              keep_sets=args.keep_sets, fsync=args.fsync,
+                              memory_limit=args.memory_limit * 2 ** 20)
+    except ValueError as e:
+        print(f"Cannot name brand folders: {e}", file=sys.stderr)
+        return 2
+    start = time.perf_counter()
+    results = runner.run()
+    failures = [r for r in results if 'error' in r]
+
+    os.makedirs(args.output, exist_ok=True)
+    report = os.path.join(args.output, REPORT_FILE)
+    with open(report, 'w', encoding='utf-8') as f:
+        json.dump({'jobs': results, 'failures': len(failures),
+                   'seconds': time.perf_counter() - start}, f, indent=2)
+    print(f"{len(results) - len(failures)}/{len(results)} jobs succeeded in "
+          f"{time.perf_counter() - start:.1f}s; report: {report}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
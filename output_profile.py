@@ -0,0 +1,212 @@
+"""
+Elsakr Favicon Generator - Output Profiles
+Declarative output profiles and the render graph compiled from them.
+"""
+
+import os
+import json
+
+import icofile
+import variants
+
+
+PROFILES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+
+DEFAULT_PROFILE = "default"
+
+TARGET_TYPES = ('png', 'ico', 'manifest') + tuple(variants.FORMATS)
+
+MIME_TYPES = {
+    '.png': 'image/png',
+    '.webp': 'image/webp',
+    '.avif': 'image/avif',
+    '.ico': 'image/x-icon',
+    '.webmanifest': 'application/manifest+json',
+}
+
+
+class Target:
+    """One artifact described by a profile."""
+
+    def __init__(self, spec, default_background):
+        self.spec = dict(spec)
+        try:
+            self.name = spec['name']
+            self.type = spec['type']
+        except KeyError as e:
+            raise ValueError(f"Profile target is missing {e.args[0]!r}: {spec}")
+        if self.type not in TARGET_TYPES:
+            raise ValueError(f"{self.name}: unknown target type {self.type!r}")
+
+        self.background = spec.get('background', default_background)
+        self.link = spec.get('link')
+        self.icons = spec.get('icons', [])
+        self.fields = spec.get('fields', {})
+        # browsers request /favicon.ico by its fixed name
+        self.fingerprint = spec.get('fingerprint', self.type != 'ico')
+        # the png target a webp/avif variant was derived from
+        self.variant_of = spec.get('variant_of')
+        self.variants = spec.get('variants', [])
+        if self.variants and self.type != 'png':
+            raise ValueError(f"{self.name}: only png targets can have variants")
+
+        if self.type in ('png',) + tuple(variants.FORMATS):
+            self.sizes = [self._size(spec.get('size'))]
+        elif self.type == 'ico':
+            self.sizes = [self._size(s) for s in spec.get('sizes', [])]
+            if not self.sizes:
+                raise ValueError(f"{self.name}: an ico target needs 'sizes'")
+            if max(self.sizes)[0] > icofile.MAX_SIZE:
+                raise ValueError(f"{self.name}: ICO entries are at most {icofile.MAX_SIZE} px")
+            self.png_min_size = spec.get('png_min_size', icofile.PNG_MIN_SIZE)
+        else:
+            self.sizes = []
+
+        if self.type in variants.FORMATS:
+            self.quality = spec.get('quality', list(variants.DEFAULT_QUALITIES))
+            if not self.quality:
+                raise ValueError(f"{self.name}: 'quality' needs at least one setting")
+            self.max_bytes = spec.get('max_bytes')
+            self.max_ms = spec.get('max_ms', variants.DEFAULT_MAX_MS)
+
+    def variant_specs(self):
+        """Target specs of this png target's webp/avif variants.
+
+        A variant is written next to the png under the same stem, with the
+        same size and background; one of a rel="icon" png is linked too.
+        Entries are a format name or a dict with 'format' plus optional
+        'quality' (list, best first), 'max_bytes' and 'max_ms' budgets.
+        """
+        specs = []
+        for entry in self.variants:
+            entry = {'format': entry} if isinstance(entry, str) else dict(entry)
+            fmt = entry.pop('format', None)
+            if fmt not in variants.FORMATS:
+                raise ValueError(f"{self.name}: unknown variant format {fmt!r} "
+                                 f"(use {' or '.join(variants.FORMATS)})")
+            spec = dict(entry, name=os.path.splitext(self.name)[0] + '.' + fmt,
+                        type=fmt, size=self.size[0], variant_of=self.name)
+            for key in ('background', 'fingerprint'):
+                if key in self.spec:
+                    spec.setdefault(key, self.spec[key])
+            if self.link == 'icon':
+                spec['link'] = 'icon'
+            specs.append(spec)
+        return specs
+
+    def _size(self, value):
+        if not isinstance(value, int) or value <= 0:
+            raise ValueError(f"{self.name}: invalid size {value!r}")
+        return (value, value)
+
+    @property
+    def size(self):
+        """Pixel size of a single-image target."""
+        return self.sizes[0] if self.sizes else None
+
+    @property
+    def mime_type(self):
+        return MIME_TYPES.get(os.path.splitext(self.name)[1].lower(),
+                              'application/octet-stream')
+
+    def __repr__(self):
+        return f"Target({self.name!r}, {self.type!r})"
+
+
+class Profile:
+    """A named set of output targets loaded from a JSON document."""
+
+    def __init__(self, data):
+        self.name = data.get('name', 'custom')
+        self.description = data.get('description', '')
+        self.background = data.get('background', 'flatten')
+        self.meta = data.get('meta', [])
+        self.targets = []
+        # variants this Pillow build cannot write are left out, by name
+        self.unavailable = []
+        for spec in data.get('targets', []):
+            target = Target(spec, self.background)
+            self.targets.append(target)
+            for variant in target.variant_specs():
+                if variants.available(variant['type']):
+                    self.targets.append(Target(variant, self.background))
+                else:
+                    self.unavailable.append(variant['name'])
+        if not self.targets:
+            raise ValueError(f"Profile {self.name!r} has no targets")
+
+        names = [t.name for t in self.targets]
+        duplicates = sorted({n for n in names if names.count(n) > 1})
+        if duplicates:
+            raise ValueError(f"Profile {self.name!r} repeats {', '.join(duplicates)}")
+
+        by_name = {t.name: t for t in self.targets}
+        for target in self.targets:
+            for icon in target.icons:
+                if by_name.get(icon) is None or by_name[icon].type != 'png':
+                    raise ValueError(f"{target.name}: icon {icon!r} is not a png target")
+
+    def target(self, name):
+        """Look up a target by file name."""
+        for target in self.targets:
+            if target.name == name:
+                return target
+        raise KeyError(name)
+
+    def variants_of(self, name):
+        """The webp/avif variant targets derived from a png target."""
+        return [target for target in self.targets if target.variant_of == name]
+
+
+def load_profile(name_or_path=None):
+    """Load a bundled profile by name, or a profile JSON file by path."""
+    name_or_path = name_or_path or DEFAULT_PROFILE
+    path = name_or_path
+    if not os.path.exists(path):
+        path = os.path.join(PROFILES_DIR, name_or_path + ".json")
+    if not os.path.exists(path):
+        raise ValueError(f"Unknown profile: {name_or_path}")
+    with open(path, encoding='utf-8') as f:
+        return Profile(json.load(f))
+
+
+def available_profiles():
+    """Names of the profiles bundled with the application."""
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(PROFILES_DIR)
+                  if name.endswith(".json"))
+
+
+def resolve_background(background, bg_color):
+    """Map a target's background setting to a fill color, or None to keep alpha."""
+    if background == 'transparent':
+        return None
+    if background == 'flatten':
+        return bg_color
+    return background
+
+
+class RenderGraph:
+    """A profile compiled against settings into shared image nodes.
+
+    Every distinct (size, background) pair is a node that is rendered once;
+    each artifact refers to the nodes it is assembled from.
+    """
+
+    def __init__(self, profile, bg_color):
+        self.profile = profile
+        self.nodes = []
+        self.artifacts = []
+
+        seen = set()
+        for target in profile.targets:
+            fill = resolve_background(target.background, bg_color)
+            keys = [(size, fill) for size in target.sizes]
+            for key in keys:
+                if key not in seen:
+                    seen.add(key)
+                    self.nodes.append(key)
+            self.artifacts.append((target, keys))
+
+    def sizes(self):
+        """Every distinct pixel size the graph needs."""
+        return sorted({size for size, _ in self.nodes}, reverse=True)
@@ -0,0 +1,130 @@
+"""
+Elsakr Favicon Generator - PNG Optimizer
+Try lossless and near-lossless PNG encodings and keep the smallest.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageChops, ImageStat
+
+from encoding import encode_image
+
+# zlib strategies exposed by Pillow's PNG encoder as compress_type
+ZLIB_STRATEGIES = {
+    'default': 0,
+    'filtered': 1,
+    'huffman': 2,
+    'rle': 3,
+}
+
+
+def mean_error(original, candidate):
+    """Mean absolute per-channel difference (0-255) after decoding both as RGBA."""
+    diff = ImageChops.difference(original.convert('RGBA'), candidate.convert('RGBA'))
+    # getbbox() would only look at the alpha band of an RGBA difference
+    if all(high == 0 for _, high in diff.getextrema()):
+        return 0.0
+    return sum(ImageStat.Stat(diff).mean) / 4
+
+
+def palette_bits(colors):
+    """Smallest PNG bit depth that holds a palette of this many colors."""
+    for bits in (1, 2, 4):
+        if colors <= 1 << bits:
+            return bits
+    return 8
+
+
+def exact_palette(img, colors):
+    """img as a palette image of exactly these RGBA colors (at most 256).
+
+    Quantizing does not guarantee an exact palette even when there are
+    few enough colors, so the pixels are mapped to their entries directly.
+    """
+    index = {bytes(color): i for i, color in enumerate(colors)}
+    data = img.convert('RGBA').tobytes()
+    palette = Image.frombytes('P', img.size,
+                              bytes(index[data[i:i + 4]] for i in range(0, len(data), 4)))
+    palette.putpalette([channel for color in colors for channel in color], rawmode='RGBA')
+    return palette
+
+
+def reduced_images(img, tolerance):
+    """Candidate pixel formats for img as (label, image, error) tuples."""
+    candidates = [('truecolor', img, 0.0)]
+    has_alpha = img.mode == 'RGBA'
+
+    if has_alpha and img.getchannel('A').getextrema() == (255, 255):
+        img = img.convert('RGB')
+        candidates.append(('opaque', img, 0.0))
+
+    rgb = img.convert('RGB')
+    r, g, b = rgb.split()
+    if ImageChops.difference(r, g).getbbox() is None and ImageChops.difference(g, b).getbbox() is None:
+        gray = img.convert('LA' if img.mode == 'RGBA' else 'L')
+        candidates.append(('grayscale', gray, 0.0))
+
+    colors = img.convert('RGBA').getcolors(256)
+    if colors:
+        candidates.append(('palette', exact_palette(img, [color for _, color in colors]), 0.0))
+    else:
+        method = Image.Quantize.FASTOCTREE if img.mode == 'RGBA' else Image.Quantize.MEDIANCUT
+        palette = img.quantize(colors=256, method=method, dither=Image.Dither.NONE)
+        error = mean_error(img, palette)
+        if error <= tolerance:
+            # error is only 0 when every decoded pixel matches
+            label = 'palette' if error == 0 else f'palette~{error:.2f}'
+            candidates.append((label, palette, error))
+
+    return candidates
+
+
+def trials_for(label, img):
+    """Encoder settings to try for one candidate image."""
+    params = []
+    bits = {}
+    if img.mode == 'P':
+        bits = {'bits': palette_bits(len(img.getcolors(256) or range(256)))}
+    for strategy, compress_type in ZLIB_STRATEGIES.items():
+        params.append((f"{label}/{strategy}", dict(compress_level=9,
+                                                    compress_type=compress_type, **bits)))
+    params.append((f"{label}/optimize", dict(optimize=True, **bits)))
+    return params
+
+
+def optimize_png(img, tolerance=0.0, workers=None):
+    """Encode img as the smallest PNG found within tolerance.
+
+    tolerance is the allowed mean per-channel error (0-255) for palette
+    quantization; 0 only accepts exact palettes. Trials (pixel format x
+    bit depth x zlib level/strategy) run in parallel, since zlib releases
+    the GIL. Returns (png bytes, report dict).
+    """
+    start = time.perf_counter()
+    baseline = encode_image(img, 'PNG')
+
+    trials = []
+    for label, candidate, error in reduced_images(img, tolerance):
+        for name, params in trials_for(label, candidate):
+            trials.append((name, candidate, params, error))
+
+    def run(trial):
+        name, candidate, params, error = trial
+        return name, encode_image(candidate, 'PNG', **params), error
+
+    best_name, best, best_error = 'default', baseline, 0.0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for name, data, error in pool.map(run, trials):
+            if len(data) < len(best):
+                best_name, best, best_error = name, data, error
+
+    report = {
+        'original_bytes': len(baseline),
+        'bytes': len(best),
+        'saved': len(baseline) - len(best),
+        'encoding': best_name,
+        'error': round(best_error, 3),
+        'trials': len(trials) + 1,
+        'seconds': time.perf_counter() - start,
+    }
+    return best, report
@@ -0,0 +1,421 @@
+"""
+Elsakr Favicon Generator - HTTP Service
+Local on-demand favicon rendering with request coalescing and an LRU cache.
+
+    python server.py --port 8765 --root assets/
+    curl --data-binary @logo.png "http://127.0.0.1:8765/render?profile=default" -o favicons.zip
+    curl "http://127.0.0.1:8765/render?path=logo.png&artifact=favicon.ico" -o favicon.ico
+    curl http://127.0.0.1:8765/metrics
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+from PIL import UnidentifiedImageError
+
+from archive import ArchiveWriter
+from cache import hash_key, source_set_id
+from engine import ENCODER_VERSION, FaviconEngine, default_workers, master_paths
+from events import EventBus
+from loader import (DEFAULT_MEMORY_LIMIT, SourceTooLarge, load_source_set,
+                    working_size_for)
+from output_profile import DEFAULT_PROFILE, MIME_TYPES, available_profiles, load_profile
+
+
+DEFAULT_PORT = 8765
+
+DEFAULT_CACHE_BYTES = 256 * 2 ** 20
+
+DEFAULT_MAX_UPLOAD = 64 * 2 ** 20
+
+# Access log writes per second; requests in between are written together
+ACCESS_LOG_FPS = 4
+
+STATUS_TEXT = {
+    200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+    405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error',
+}
+
+
+class HTTPError(Exception):
+    """A request that is answered with an error status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LRUCache:
+    """Least-recently-used cache bounded by the total size of its values."""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, size):
+        """Store value; entries larger than the whole cache are not kept."""
+        if key in self._entries:
+            self.bytes -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            'entries': len(self._entries), 'bytes': self.bytes,
+            'max_bytes': self.max_bytes, 'hits': self.hits,
+            'misses': self.misses, 'evictions': self.evictions,
+        }
+
+
+def render_set(source, options, masters=()):
+    """Render a full favicon set (runs in a worker process).
+
+    source is a file path or the uploaded image bytes; masters are the
+    paths of a local source's size masters. Returns a dict of artifact
+    name to bytes, in profile order.
+    """
+    engine = FaviconEngine(bg_color=options['bg'], profile=load_profile(options['profile']),
+                           workers=options['threads'], keep_alpha=options['keep_alpha'],
+                           optimize_png=options['optimize'])
+    working_size = working_size_for(engine.render_sizes())
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    loaded = load_source_set(source, masters, working_size, options['memory_limit'])
+    return {artifact.name: artifact.data for artifact in engine.render(loaded.images)}
+
+
+def zip_artifacts(artifacts):
+    """Pack a rendered set into a zip archive."""
+    buf = io.BytesIO()
+    with ArchiveWriter(buf, 'zip') as archive:
+        for name, data in artifacts.items():
+            archive.add(name, data)
+    return buf.getvalue()
+
+
+def content_type(name):
+    return MIME_TYPES.get(os.path.splitext(name)[1].lower(), 'application/octet-stream')
+
+
+def flag(query, name):
+    return query.get(name, ['0'])[0].lower() in ('1', 'true', 'yes', 'on')
+
+
+class FaviconService:
+    """Render favicon sets on demand and keep recent results in memory.
+
+    Renders run on a process pool. Requests for a set that is already being
+    rendered wait for that render instead of starting another, and finished
+    sets are kept in an LRU bounded by their total artifact bytes. With an
+    EventBus as events, every answered request is published as a
+    'request' event.
+    """
+
+    def __init__(self, root=None, jobs=None, cache_bytes=DEFAULT_CACHE_BYTES,
+                 max_upload=DEFAULT_MAX_UPLOAD, memory_limit=DEFAULT_MEMORY_LIMIT,
+                 events=None):
+        self.root = os.path.realpath(root or os.getcwd())
+        self.jobs = jobs or default_workers()
+        self.max_upload = max_upload
+        self.memory_limit = memory_limit
+        self.events = events
+        self.cache = LRUCache(cache_bytes)
+        self.executor = ProcessPoolExecutor(max_workers=self.jobs)
+        self.counters = {'requests': 0, 'renders': 0, 'coalesced': 0, 'errors': 0,
+                         'render_seconds': 0.0}
+        self._inflight = {}
+
+    def metrics(self):
+        metrics = dict(self.counters, inflight=len(self._inflight), jobs=self.jobs)
+        metrics['cache'] = self.cache.stats()
+        return metrics
+
+    def options_from_query(self, query):
+        profile = query.get('profile', [DEFAULT_PROFILE])[0]
+        # only bundled profiles: a profile path would let clients read server files
+        if profile not in available_profiles():
+            raise HTTPError(400, f"Unknown profile {profile!r}")
+        return {
+            'bg': query.get('bg', ['#FFFFFF'])[0],
+            'profile': profile,
+            'keep_alpha': flag(query, 'keep_alpha'),
+            'optimize': flag(query, 'optimize'),
+            # one process per render already keeps the cores busy
+            'threads': 1 if self.jobs > 1 else default_workers(),
+            'memory_limit': self.memory_limit,
+        }
+
+    def resolve_path(self, path):
+        """Absolute path of a local source, which must lie under self.root."""
+        full = os.path.realpath(os.path.join(self.root, path))
+        if os.path.commonpath([full, self.root]) != self.root:
+            raise HTTPError(403, f"{path} is outside the served root")
+        if not os.path.isfile(full):
+            raise HTTPError(404, f"{path} not found")
+        return full
+
+    def masters_for(self, path):
+        """Size masters of a local source, leaving out links that leave the root."""
+        return [master for master in master_paths(path)
+                if os.path.commonpath([os.path.realpath(master), self.root]) == self.root]
+
+    async def render(self, source, options):
+        """Rendered set for source and options, and how it was obtained."""
+        loop = asyncio.get_running_loop()
+        masters = []
+        if isinstance(source, bytes):
+            digest = await loop.run_in_executor(None, lambda: hashlib.sha256(source).hexdigest())
+        else:
+            masters = self.masters_for(source)
+            digest = await loop.run_in_executor(
+                None, source_set_id, [source] + masters, 0)
+        key = hash_key({'source': digest, 'options': options, 'encoder': ENCODER_VERSION})
+
+        artifacts = self.cache.get(key)
+        if artifacts is not None:
+            return artifacts, 'hit'
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.counters['coalesced'] += 1
+            how = 'coalesced'
+        else:
+            pending = asyncio.ensure_future(
+                self._render_and_cache(key, source, options, masters))
+            self._inflight[key] = pending
+            how = 'miss'
+        # shield: a client disconnecting must not cancel the shared render
+        return await asyncio.shield(pending), how
+
+    async def _render_and_cache(self, key, source, options, masters):
+        start = time.perf_counter()
+        try:
+            artifacts = await asyncio.get_running_loop().run_in_executor(
+                self.executor, render_set, source, options, masters)
+        finally:
+            del self._inflight[key]
+            self.counters['renders'] += 1
+            self.counters['render_seconds'] += time.perf_counter() - start
+        self.cache.put(key, artifacts, sum(len(data) for data in artifacts.values()))
+        return artifacts
+
+    async def handle_render(self, method, query, body):
+        options = self.options_from_query(query)
+        if method == 'POST':
+            if not body:
+                raise HTTPError(400, "POST an image as the request body")
+            source = body
+        elif 'path' in query:
+            source = self.resolve_path(query['path'][0])
+        else:
+            raise HTTPError(400, "Pass ?path= or POST an image")
+
+        try:
+            artifacts, how = await self.render(source, options)
+        except SourceTooLarge as e:
+            raise HTTPError(413, str(e))
+        except UnidentifiedImageError:
+            raise HTTPError(400, "Source is not a recognized image")
+        except (OSError, ValueError) as e:
+            raise HTTPError(400, f"Cannot render source: {e}")
+
+        name = query.get('artifact', [None])[0]
+        if name is None:
+            data = await asyncio.get_running_loop().run_in_executor(
+                None, zip_artifacts, artifacts)
+            return 200, 'application/zip', data, {'X-Cache': how}
+        if name not in artifacts:
+            raise HTTPError(404, f"{options['profile']} has no artifact {name!r}")
+        return 200, content_type(name), artifacts[name], {'X-Cache': how}
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        if url.path == '/render':
+            if method not in ('GET', 'POST'):
+                raise HTTPError(405, "Use GET or POST")
+            return await self.handle_render(method, query, body)
+        if url.path == '/metrics':
+            return 200, 'application/json', json.dumps(self.metrics(), indent=2).encode(), {}
+        if url.path == '/profiles':
+            return 200, 'application/json', json.dumps(available_profiles()).encode(), {}
+        raise HTTPError(404, f"No route for {url.path}")
+
+    async def handle_connection(self, reader, writer):
+        """Serve one HTTP/1.1 request per connection."""
+        try:
+            try:
+                head = await reader.readuntil(b'\r\n\r\n')
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                return
+            self.counters['requests'] += 1
+            start = time.perf_counter()
+            method = target = '-'
+            try:
+                method, target, headers = self.parse_head(head)
+                length = self.content_length(headers)
+                if length > self.max_upload:
+                    raise HTTPError(413, f"Uploads are limited to {self.max_upload // 2 ** 20} MB")
+                body = await reader.readexactly(length) if length else b''
+                status, ctype, data, extra = await self.dispatch(method, target, body)
+            except HTTPError as e:
+                self.counters['errors'] += 1
+                status, ctype, data, extra = e.status, 'text/plain; charset=utf-8', \
+                    (str(e) + '\n').encode(), {}
+            except Exception as e:
+                self.counters['errors'] += 1
+                status, ctype, data, extra = 500, 'text/plain; charset=utf-8', \
+                    f"{type(e).__name__}: {e}\n".encode(), {}
+
+            lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                     f"Content-Type: {ctype}", f"Content-Length: {len(data)}",
+                     "Connection: close"]
+            lines += [f"{name}: {value}" for name, value in extra.items()]
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + data)
+            await writer.drain()
+            if self.events is not None:
+                self.events.publish('request', method=method, target=target, status=status,
+                                    bytes=len(data), cache=extra.get('X-Cache', '-'),
+                                    seconds=time.perf_counter() - start)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def parse_head(head):
+        try:
+            request_line, *header_lines = head.decode('latin-1').split('\r\n')
+            method, target, _ = request_line.split(' ', 2)
+            headers = {}
+            for line in header_lines:
+                if line:
+                    name, value = line.split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+            return method.upper(), target, headers
+        except ValueError:
+            raise HTTPError(400, "Malformed request")
+
+    @staticmethod
+    def content_length(headers):
+        """The request's Content-Length; 400 unless it is a plain decimal number."""
+        value = headers.get('content-length', '0')
+        # int() would also accept "-1", "+5" or "1_000"
+        if not (value.isascii() and value.isdigit()):
+            raise HTTPError(400, "Malformed Content-Length")
+        return int(value)
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT):
+        """Start listening and return the asyncio server."""
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+async def write_access_log(events, stream, fps=ACCESS_LOG_FPS):
+    """Write request events to stream, all the lines of a frame in one write."""
+    wake = asyncio.Event()
+    events.on_wake = wake.set
+    while True:
+        await wake.wait()
+        await asyncio.sleep(1 / fps)
+        wake.clear()
+        lines = [f"{time.strftime('%H:%M:%S')} {e['method']} {e['target']} {e['status']} "
+                 f"{e['bytes']} {e['cache']} {e['seconds'] * 1000:.1f}ms\n"
+                 for kind, e in events.drain() if kind == 'request']
+        stream.write(''.join(lines))
+        stream.flush()
+
+
+async def serve(service, host, port):
+    server = await service.start(host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Serving favicons on http://{address[0]}:{address[1]} "
+          f"(root {service.root}, {service.jobs} worker(s))")
+    # keep a reference: the loop only holds tasks weakly
+    log_task = None
+    if service.events is not None:
+        log_task = asyncio.ensure_future(write_access_log(service.events, sys.stderr))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if log_task:
+            log_task.cancel()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="favicon-server",
+        description="Serve favicon sets rendered on demand over local HTTP."
+    )
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="address to bind (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help="port to listen on, 0 for any free port (default: %(default)s)")
+    parser.add_argument("--root", default=None,
+                        help="directory that ?path= sources may be read from (default: cwd)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="render processes (default: CPU count)")
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_CACHE_BYTES // 2 ** 20,
+                        help="memory for cached sets in MB (default: %(default)s)")
+    parser.add_argument("--max-upload-mb", type=int, default=DEFAULT_MAX_UPLOAD // 2 ** 20,
+                        help="largest accepted upload in MB (default: %(default)s)")
+    parser.add_argument("--memory-limit", type=int, default=DEFAULT_MEMORY_LIMIT // 2 ** 20,
+                        metavar="MB", help="refuse sources that need more than this to "
+                                           "decode (default: %(default)s)")
+    parser.add_argument("--access-log", action="store_true",
+                        help="log each request to stderr (written a few times per second)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    service = FaviconService(root=args.root, jobs=args.jobs,
+                             cache_bytes=args.cache_mb * 2 ** 20,
+                             max_upload=args.max_upload_mb * 2 ** 20,
+                             memory_limit=args.memory_limit * 2 ** 20,
+                             events=EventBus() if args.access_log else None)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""
+Elsakr Favicon Generator - App Session
+The app's source, preview and job state, without any Tk.
+"""
+
+import os
+import threading
+
+from archive import ARCHIVE_FORMATS, format_for, open_archive
+from cache import source_set_id
+from engine import Cancelled, FaviconEngine, build_proxy, master_paths, render_previews
+from events import EventBus
+from instrument import Recorder
+from jobs import JobScheduler
+from loader import DEFAULT_MEMORY_LIMIT, load_source_set, working_size_for
+from output_profile import load_profile
+from watcher import SourceWatcher
+
+
+class PreviewRenderer:
+    """Render preview images on a background thread.
+
+    Requests are debounced and handed to a single worker thread that
+    always picks the newest one, so a burst of loads renders once and
+    stale results are dropped. The squared proxy is built once per
+    source. Finished images are published on the bus as a 'previews'
+    event with the request's generation; consumers show them only while
+    is_current(generation), so only the newest request reaches the UI.
+    """
+
+    DEBOUNCE = 0.08
+    PROXY_SIZE = 1024
+
+    def __init__(self, bus, debounce=DEBOUNCE):
+        self.bus = bus
+        self.debounce = debounce
+        self.generation = 0
+        self._latest = None
+        self._closed = False
+        self._proxy_source = None
+        self._proxy = None
+        self._wakeup = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self, source, slots):
+        """Schedule a preview render, superseding any earlier request."""
+        with self._wakeup:
+            self.generation += 1
+            self._latest = (self.generation, source, slots)
+            self._wakeup.notify()
+
+    def cancel(self):
+        """Drop pending and in-flight requests."""
+        with self._wakeup:
+            self.generation += 1
+            self._latest = None
+
+    def is_current(self, generation):
+        return generation == self.generation
+
+    def close(self):
+        """Stop the worker thread."""
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify()
+        self._thread.join()
+
+    def _take(self):
+        """The newest request once no newer one came in for debounce seconds."""
+        with self._wakeup:
+            while self._latest is None and not self._closed:
+                self._wakeup.wait()
+            settled = None
+            while self._latest is not None and not self._closed and settled != self.generation:
+                settled = self.generation
+                self._wakeup.wait(self.debounce)
+            if self._closed:
+                return None
+            request, self._latest = self._latest, None
+            return request or ()
+
+    def _run(self):
+        while True:
+            request = self._take()
+            if request is None:
+                break
+            if not request:
+                continue
+            generation, source, slots = request
+            try:
+                if source is not self._proxy_source:
+                    self._proxy = build_proxy(source, self.PROXY_SIZE)
+                    self._proxy_source = source
+                if not self.is_current(generation):
+                    continue
+                previews = render_previews(self._proxy, slots)
+            except Exception:
+                continue
+            self.bus.publish('previews', generation=generation, previews=previews)
+        self._proxy = self._proxy_source = None
+
+
+class AppSession:
+    """Everything the app keeps between user actions, minus the widgets.
+
+    The loaded source set and its cache id, a PreviewRenderer, generate
+    and export jobs on a JobScheduler and an optional SourceWatcher.
+    Workers report on self.events ('progress', 'previews', 'html', 'done',
+    'cancelled', 'failed', 'source_changed'): the window drains it on the
+    Tk thread, soak.py drains it directly. Loading replaces the previous
+    source rather than adding to it.
+    """
+
+    def __init__(self, profile=None, memory_limit=DEFAULT_MEMORY_LIMIT, on_wake=None,
+                 preview_debounce=PreviewRenderer.DEBOUNCE):
+        self.profile = profile if profile is not None else load_profile()
+        self.memory_limit = memory_limit
+        self.events = EventBus(on_wake=on_wake)
+        self.previews = PreviewRenderer(self.events, preview_debounce)
+        self.scheduler = JobScheduler()
+        self.watcher = None
+        self.source_image = None
+        self.source_path = None
+        self.source_id = None
+
+    def load(self, path):
+        """Load path with its size masters and return the LoadedSource."""
+        # Release the previous master before decoding the next one
+        self.source_image = None
+        working_size = working_size_for(FaviconEngine(profile=self.profile).render_sizes())
+        masters = master_paths(path)
+        source = load_source_set(path, masters, working_size, self.memory_limit)
+        # the whole source set when size masters sit next to the file
+        self.source_image = source.images
+        self.source_path = path
+        self.source_id = source_set_id([path] + masters, working_size)
+        return source
+
+    def preview_slots(self, display_sizes):
+        """{name: (favicon size, display size)} for the preview grid."""
+        slots = {}
+        for name, display_size in display_sizes.items():
+            try:
+                size = max(self.profile.target(name).sizes)
+            except (KeyError, ValueError):
+                size = (32, 32)
+            slots[name] = (size, display_size)
+        return slots
+
+    def request_previews(self, display_sizes):
+        """Render previews of the current source off the calling thread."""
+        if self.source_image:
+            self.previews.request(self.source_image, self.preview_slots(display_sizes))
+
+    def generate(self, output_path, bg_color, notify=True):
+        """Queue a staged generate of the current source and return its Job.
+
+        Identical requests merge into the running job; changed ones
+        replace it. notify is passed on with the 'done' and 'failed'
+        events; runs nobody asked for (watch mode) set it to False.
+        """
+        source_image, source_id = self.source_image, self.source_id
+        key = (source_id, bg_color, self.profile.name, os.path.abspath(output_path))
+        return self.scheduler.submit(key, lambda cancel: self._generate(
+            output_path, cancel, source_image, source_id, bg_color, notify))
+
+    def export(self, path, bg_color):
+        """Queue streaming the current set into an archive and return its Job."""
+        source_image = self.source_image
+        key = ('export', self.source_id, bg_color, self.profile.name, os.path.abspath(path))
+        return self.scheduler.submit(key, lambda cancel: self._export(
+            path, cancel, source_image, bg_color))
+
+    def cancel(self):
+        """Cancel the running job; False if there was none."""
+        if not self.scheduler.busy:
+            return False
+        self.scheduler.cancel()
+        return True
+
+    def watch(self, path):
+        """Publish 'source_changed' whenever path changes."""
+        self.unwatch()
+        self.watcher = SourceWatcher(
+            [path], lambda paths: self.events.publish('source_changed')).start()
+        return self.watcher
+
+    def unwatch(self):
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+
+    def close(self):
+        """Stop the watcher, jobs and preview thread."""
+        self.unwatch()
+        self.scheduler.cancel()
+        self.previews.close()
+
+    def _generate(self, output_path, cancel, source_image, source_id, bg_color, notify):
+        events = self.events
+        try:
+            recorder = Recorder()
+            engine = FaviconEngine(bg_color=bg_color, profile=self.profile, recorder=recorder)
+            # staged: a web server reading the folder never sees a half-written set
+            written = engine.generate_staged(source_image, output_path, keep=0,
+                                             on_progress=events.progress,
+                                             source_id=source_id, cancel=cancel)
+
+            total = engine.total_steps()
+            skipped = total - len(written)
+            status = f"✓ Done! ({skipped} up to date)" if skipped else "✓ Done!"
+            if recorder.events:
+                status += f" — {recorder.summary()}"
+            events.progress(total, total, status)
+            events.publish('html', html=engine.html)
+            events.publish('done', message=f"All favicons generated!\n\n{output_path}",
+                           notify=notify)
+
+        except Cancelled:
+            events.publish('cancelled')
+
+        except Exception as e:
+            events.publish('failed', message=str(e), notify=notify)
+
+    def _export(self, path, cancel, source_image, bg_color):
+        events = self.events
+        try:
+            engine = FaviconEngine(bg_color=bg_color, profile=self.profile)
+            fmt = format_for(path)
+            if fmt is None:
+                raise ValueError(f"Cannot tell the archive format of {path!r}; use "
+                                 f"one of {', '.join(ARCHIVE_FORMATS)}")
+            # Written under a temporary name and renamed once complete: a failed
+            # or cancelled export leaves whatever is at path untouched
+            tmp = path + ".tmp"
+            archive = open_archive(tmp, fmt)
+            try:
+                with archive:
+                    count = engine.export(source_image, archive, on_progress=events.progress,
+                                          cancel=cancel)
+            except BaseException:
+                # never leave a truncated archive behind
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                raise
+            os.replace(tmp, path)
+
+            events.progress(count, count, f"✓ Exported {count} files")
+            events.publish('html', html=engine.html)
+            events.publish('done', message=f"Favicons exported!\n\n{path}")
+
+        except Cancelled:
+            events.publish('cancelled')
+
+        except Exception as e:
+            events.publish('failed', message=str(e))
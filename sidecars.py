@@ -0,0 +1,78 @@
+"""
+Elsakr Favicon Generator - Precompressed Sidecars
+.gz and .br copies of compressible artifacts for static servers.
+"""
+
+import gzip
+
+DEFAULT_MIN_SAVING = 0.1
+
+# Artifact types worth compressing; PNG data is already deflated
+COMPRESSIBLE_TYPES = ('ico', 'manifest')
+
+_brotli = []
+
+
+def brotli():
+    """The brotli module, or None if it is not installed (it is optional)."""
+    if not _brotli:
+        try:
+            import brotli as module
+        except ImportError:
+            module = None
+        _brotli.append(module)
+    return _brotli[0]
+
+
+def compress_gzip(data):
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def compress_brotli(data):
+    return brotli().compress(data, quality=11)
+
+
+ENCODERS = {
+    'gz': compress_gzip,
+    'br': compress_brotli,
+}
+
+
+def available_encodings():
+    """Sidecar encodings usable here, in preference order."""
+    return [name for name in ENCODERS if name != 'br' or brotli() is not None]
+
+
+def parse_encodings(value):
+    """'auto' or a comma-separated list such as 'gz,br' -> list of encodings."""
+    if value in (None, '', 'auto'):
+        return available_encodings()
+    encodings = [name.strip().lstrip('.') for name in value.split(',') if name.strip()]
+    for name in encodings:
+        if name not in ENCODERS:
+            raise ValueError(f"unknown sidecar encoding {name!r} (use gz or br)")
+        if name == 'br' and brotli() is None:
+            raise ValueError("br sidecars need the brotli package (pip install brotli)")
+    return encodings
+
+
+def compress(data, encodings, min_saving=DEFAULT_MIN_SAVING):
+    """Compress data with each encoding at its maximum level.
+
+    Returns (sidecars, report): sidecars maps an extension such as '.gz'
+    to the compressed bytes, for encodings that save at least min_saving
+    of the original size; report has the size and saving of every
+    encoding tried, kept or not.
+    """
+    sidecars = {}
+    report = {}
+    for name in encodings:
+        compressed = ENCODERS[name](data)
+        saving = 1 - len(compressed) / len(data) if data else 0.0
+        kept = saving >= min_saving
+        report['.' + name] = {'bytes': len(compressed), 'saving': round(saving, 4),
+                              'kept': kept}
+        if kept:
+            sidecars['.' + name] = compressed
+    return sidecars, report
@@ -0,0 +1,373 @@
+"""
+Elsakr Favicon Generator - Soak Test
+Thousands of load → preview → generate cycles that fail on memory growth.
+
+    python soak.py                            # 1000 cycles with the default limits
+    python soak.py --cycles 5000 --report soak.json
+    python soak.py --rss-limit-mb 32 --traced-limit-mb 2 --top 20
+    python soak.py --headless                 # the app session without its window
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import tracemalloc
+
+from benchmark import PREVIEW_SLOTS, has_display, make_source
+from events import dispatch
+from loader import current_rss
+from output_profile import load_profile
+from session import AppSession
+
+DEFAULT_CYCLES = 1000
+
+DEFAULT_WARMUP = 20
+
+# Allowed growth between the end of the warm-up and the last cycle
+DEFAULT_RSS_LIMIT = 64 * 2 ** 20
+DEFAULT_TRACED_LIMIT = 8 * 2 ** 20
+
+# Stack depth kept for every traced allocation
+TRACE_FRAMES = 12
+
+# How long one load, preview or generate step may take before the soak fails (seconds)
+STEP_TIMEOUT = 120
+
+# Longest wait between two event drains (seconds)
+POLL_SECONDS = 0.05
+
+# Preview grid of the window: name -> display size
+PREVIEW_DISPLAY = {name: display for name, (_, display) in PREVIEW_SLOTS.items()}
+
+# (width, height, mode) of the rotating sources; the last one gets a 16 px master
+SOURCES = [
+    (256, 256, 'RGBA'), (1024, 1024, 'RGB'), (1024, 1024, 'P'), (1024, 1024, 'L'),
+    (1024, 1024, 'CMYK'), (2048, 2048, 'RGBA'), (1024, 576, 'RGBA'), (600, 1800, 'RGBA'),
+    (1024, 1024, 'RGBA'),
+]
+
+BACKGROUNDS = ['#FFFFFF', '#000000', '#3366CC']
+
+
+def make_sources(workdir):
+    """Write the rotating soak sources and return their paths."""
+    paths = []
+    for width, height, mode in SOURCES:
+        ext = '.tiff' if mode == 'CMYK' else '.png'
+        path = os.path.join(workdir, f"{mode}-{width}x{height}{ext}")
+        make_source(width, height, mode).save(path)
+        paths.append(path)
+    stem = os.path.splitext(paths[-1])[0]
+    make_source(16, 16, 'RGBA').save(stem + "@16.png")
+    return paths
+
+
+class HeadlessApp:
+    """The app's AppSession without a window, drained the way the window drains it.
+
+    Used where no display is available; covers everything but the Tk
+    widgets (PhotoImages, the drop zone), which WindowApp adds.
+    """
+
+    def __init__(self, output_root, profile=None):
+        self.output_root = output_root
+        self.session = AppSession(load_profile(profile), preview_debounce=0)
+        self._wake = threading.Event()
+        self.session.events.on_wake = self._wake.set
+        self.preview_images = {}
+        self.shown = None
+        self.outcome = None
+
+    def pump(self):
+        self._wake.wait(POLL_SECONDS)
+        self._wake.clear()
+        dispatch(self.session.events.drain(), self)
+
+    def on_previews(self, generation, previews):
+        if self.session.previews.is_current(generation):
+            self.preview_images.update(previews)
+            self.shown = generation
+
+    def on_done(self, message, notify=True):
+        self.outcome = 'done'
+
+    def on_cancelled(self):
+        self.outcome = 'cancelled'
+
+    def on_failed(self, message, notify=True):
+        self.outcome = message
+
+    def cycle(self, path, bg_color):
+        """One load → preview → generate round."""
+        self.session.load(path)
+        self.session.request_previews(PREVIEW_DISPLAY)
+        wait_for(lambda: self.shown == self.session.previews.generation, self.pump, "previews")
+        self.outcome = None
+        self.session.generate(output_dir(self.output_root, path), bg_color)
+        wait_for(lambda: self.outcome is not None, self.pump, "generate")
+        if self.outcome != 'done':
+            raise RuntimeError(f"generate failed: {self.outcome}")
+
+    def close(self):
+        self.session.close()
+
+
+class WindowApp:
+    """The real FaviconGenerator on a withdrawn Tk root, pumped by hand.
+
+    Exercises the window's own state on top of the session: preview
+    PhotoImages, the drop zone image and the Tk event drain.
+    """
+
+    def __init__(self, output_root, profile=None):
+        import tkinter as tk
+        from gui import FaviconGenerator
+
+        class Window(FaviconGenerator):
+            # outcomes are recorded instead of shown in modal dialogs
+            shown = None
+            outcome = None
+
+            def on_previews(self, generation, previews):
+                super().on_previews(generation, previews)
+                if self.session.previews.is_current(generation):
+                    self.shown = generation
+
+            def on_done(self, message, notify=True):
+                self.outcome = 'done'
+
+            def on_cancelled(self):
+                super().on_cancelled()
+                self.outcome = 'cancelled'
+
+            def on_failed(self, message, notify=True):
+                self.status_label.config(text="Error")
+                self.outcome = message
+
+        self.output_root = output_root
+        self.root = tk.Tk()
+        self.root.withdraw()
+        self.window = Window(self.root)
+        self.window.session.profile = load_profile(profile)
+        self.window.session.previews.debounce = 0
+        wait_for(lambda: not self.window.build_steps, self.pump, "window")
+
+    def pump(self):
+        self.root.update()
+        time.sleep(POLL_SECONDS / 10)
+
+    def cycle(self, path, bg_color):
+        """One load → preview → generate round through the window's handlers."""
+        window = self.window
+        window.load_image(path)
+        wait_for(lambda: window.shown == window.session.previews.generation, self.pump,
+                 "previews")
+        window.bg_color = bg_color
+        window.folder_entry.delete(0, 'end')
+        window.folder_entry.insert(0, output_dir(self.output_root, path))
+        window.outcome = None
+        window.generate_favicons()
+        wait_for(lambda: window.outcome is not None, self.pump, "generate")
+        if window.outcome != 'done':
+            raise RuntimeError(f"generate failed: {window.outcome}")
+
+    def close(self):
+        self.window.session.close()
+        self.root.destroy()
+
+
+def output_dir(output_root, path):
+    return os.path.join(output_root, os.path.splitext(os.path.basename(path))[0])
+
+
+def wait_for(condition, pump, what, timeout=STEP_TIMEOUT):
+    """Pump events until condition() holds; a step that never finishes fails the soak."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"{what} did not finish within {timeout} s")
+        pump()
+
+
+def sample(cycle):
+    """Memory and thread counts after a full collection."""
+    gc.collect()
+    traced, _ = tracemalloc.get_traced_memory()
+    return {'cycle': cycle, 'rss': current_rss(), 'traced': traced,
+            'threads': threading.active_count(), 'time': time.perf_counter()}
+
+
+def snapshot():
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ])
+
+
+def growth_sites(before, after, top):
+    """The allocation sites that grew most between two snapshots."""
+    sites = []
+    for stat in after.compare_to(before, 'traceback')[:top]:
+        if stat.size_diff <= 0:
+            continue
+        sites.append({'size_diff': stat.size_diff, 'count_diff': stat.count_diff,
+                      'traceback': stat.traceback.format(limit=TRACE_FRAMES)})
+    return sites
+
+
+def run(cycles=DEFAULT_CYCLES, warmup=DEFAULT_WARMUP, sample_every=50, profile=None,
+        top=10, window=None, log=print):
+    """Run the soak and return a report with samples, growth and allocation sites.
+
+    window picks the real app window (WindowApp) or the session alone
+    (HeadlessApp); None uses the window when a display is available.
+    Caches, pools and lazy imports fill up during the warm-up; growth is
+    measured from its end, so only memory that keeps growing counts.
+    """
+    if window is None:
+        window = has_display()
+    workdir = tempfile.mkdtemp(prefix="favicon-soak-")
+    tracemalloc.start(TRACE_FRAMES)
+    app = None
+    try:
+        sources = make_sources(workdir)
+        output_root = os.path.join(workdir, "out")
+        app = WindowApp(output_root, profile) if window else HeadlessApp(output_root, profile)
+        samples = []
+        for cycle in range(1, warmup + cycles + 1):
+            # the baseline is taken right before the first measured cycle
+            if cycle == warmup + 1:
+                baseline = snapshot()
+                samples.append(sample(0))
+            app.cycle(sources[cycle % len(sources)],
+                      BACKGROUNDS[(cycle // len(sources)) % len(BACKGROUNDS)])
+            measured = cycle - warmup
+            if measured > 0 and measured % sample_every == 0:
+                samples.append(sample(measured))
+                s = samples[-1]
+                log(f"cycle {s['cycle']:>6}  rss {format_mb(s['rss'])}  "
+                    f"traced {format_mb(s['traced'])}  threads {s['threads']}")
+        if samples[-1]['cycle'] != cycles:
+            samples.append(sample(cycles))
+        final = snapshot()
+    finally:
+        if app is not None:
+            app.close()
+        tracemalloc.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    first, last = samples[0], samples[-1]
+    return {
+        'cycles': cycles,
+        'warmup': warmup,
+        'mode': 'window' if window else 'headless',
+        'seconds_per_cycle': (last['time'] - first['time']) / max(1, cycles),
+        'rss_growth': (last['rss'] - first['rss']) if first['rss'] is not None else None,
+        'traced_growth': last['traced'] - first['traced'],
+        'thread_growth': last['threads'] - first['threads'],
+        'samples': samples,
+        'sites': growth_sites(baseline, final, top),
+    }
+
+
+def check(report, rss_limit=DEFAULT_RSS_LIMIT, traced_limit=DEFAULT_TRACED_LIMIT):
+    """Messages for every limit the report exceeds."""
+    failures = []
+    if report['rss_growth'] is not None and report['rss_growth'] > rss_limit:
+        failures.append(f"RSS grew {format_mb(report['rss_growth'])} "
+                        f"(limit {format_mb(rss_limit)})")
+    if report['traced_growth'] > traced_limit:
+        failures.append(f"traced Python memory grew {format_mb(report['traced_growth'])} "
+                        f"(limit {format_mb(traced_limit)})")
+    if report['thread_growth'] > 0:
+        failures.append(f"{report['thread_growth']} more threads alive than after the warm-up")
+    return failures
+
+
+def format_mb(value):
+    if value is None:
+        return "n/a"
+    return f"{value / 2 ** 20:7.1f} MB"
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return number
+
+
+def non_negative_int(value):
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError("must not be negative")
+    return number
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="favicon-soak",
+        description="Repeat load, preview and generate cycles and fail on memory growth."
+    )
+    parser.add_argument("--cycles", type=positive_int, default=DEFAULT_CYCLES,
+                        help="measured cycles (default: %(default)s)")
+    parser.add_argument("--warmup", type=non_negative_int, default=DEFAULT_WARMUP,
+                        help="cycles run before the baseline is taken (default: %(default)s)")
+    parser.add_argument("--sample-every", type=positive_int, default=50, metavar="N",
+                        help="record memory every N cycles (default: %(default)s)")
+    parser.add_argument("-p", "--profile", default=None,
+                        help="output profile to generate (default: default)")
+    parser.add_argument("--rss-limit-mb", type=float, default=DEFAULT_RSS_LIMIT / 2 ** 20,
+                        help="allowed RSS growth (default: %(default)s)")
+    parser.add_argument("--traced-limit-mb", type=float,
+                        default=DEFAULT_TRACED_LIMIT / 2 ** 20,
+                        help="allowed growth of traced Python allocations "
+                             "(default: %(default)s)")
+    parser.add_argument("--top", type=int, default=10,
+                        help="allocation sites to report (default: %(default)s)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--window", dest="window", action="store_true", default=None,
+                      help="drive the real app window (default when a display is available)")
+    mode.add_argument("--headless", dest="window", action="store_false",
+                      help="drive the app session without a window")
+    parser.add_argument("--report", metavar="FILE",
+                        help="write samples, growth and allocation sites as JSON")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    report = run(args.cycles, args.warmup, args.sample_every, args.profile, args.top,
+                 args.window)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    print(f"{report['cycles']} {report['mode']} cycles, "
+          f"{report['seconds_per_cycle'] * 1000:.0f} ms each; "
+          f"RSS {format_mb(report['rss_growth']).strip()}, "
+          f"traced {format_mb(report['traced_growth']).strip()}, "
+          f"threads {report['thread_growth']:+d} since the warm-up")
+    failures = check(report, args.rss_limit_mb * 2 ** 20, args.traced_limit_mb * 2 ** 20)
+    if not failures:
+        print("No growth beyond the limits.")
+        return 0
+    for message in failures:
+        print(f"LEAK {message}")
+    print("Largest growing allocation sites:")
+    for site in report['sites']:
+        print(f"  +{site['size_diff'] / 1024:.1f} KiB in {site['count_diff']:+d} blocks")
+        for line in site['traceback']:
+            print(f"    {line}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
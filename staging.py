@@ -0,0 +1,193 @@
+"""
+Elsakr Favicon Generator - Staged Output
+Build a favicon set beside the live one and swap it into place atomically.
+"""
+
+import os
+import sys
+import time
+import errno
+import shutil
+
+# Previous sets kept next to the output folder after a swap
+DEFAULT_KEEP = 1
+
+# Staging folders left behind by a crash are removed after this long
+STALE_STAGING_SECONDS = 3600
+
+# renameat2(2) flags and the "relative to the working directory" fd
+RENAME_EXCHANGE = 2
+AT_FDCWD = -100
+
+_renameat2 = []
+
+
+def renameat2():
+    """libc's renameat2, or None where it is missing (it is Linux-only)."""
+    if not _renameat2:
+        function = None
+        if sys.platform.startswith('linux'):
+            try:
+                import ctypes
+                import ctypes.util
+                libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                                   use_errno=True)
+                function = libc.renameat2
+            except (OSError, AttributeError):
+                pass
+        _renameat2.append(function)
+    return _renameat2[0]
+
+
+def exchange(a, b):
+    """Atomically swap two existing paths; False if the system cannot."""
+    function = renameat2()
+    if function is None:
+        return False
+    if function(AT_FDCWD, os.fsencode(a), AT_FDCWD, os.fsencode(b), RENAME_EXCHANGE) == 0:
+        return True
+    import ctypes
+    code = ctypes.get_errno()
+    # unsupported by the kernel or this filesystem: fall back to two renames
+    if code in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+        return False
+    raise OSError(code, os.strerror(code), a)
+
+
+def write_atomic(path, data):
+    """Write a file through a temporary name, so readers see old or new, never half.
+
+    Replacing rather than truncating also leaves other hard links to the
+    old file (e.g. in a previous set) untouched.
+    """
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def fsync_path(path):
+    """fsync a file or directory; directories cannot be synced on Windows."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class StagedOutput:
+    """A folder that is only replaced by complete sets.
+
+    Entering the context creates a staging folder beside output_path and
+    fills it with hard links to the current set, so incremental renders
+    into it only write what changed. On a clean exit the staging folder is
+    (optionally) fsynced in one batch and swapped with output_path: an
+    atomic exchange on Linux, two back-to-back renames elsewhere. Readers
+    such as a web server see the old set or the new one, never a mix.
+    On an error, or after discard(), the live set is left as it was.
+
+    The replaced set is kept as .<name>.previous-<time> next to the
+    output folder; only the newest keep of them are retained.
+    """
+
+    def __init__(self, output_path, keep=DEFAULT_KEEP, fsync=False):
+        self.output_path = os.path.abspath(output_path)
+        self.parent, self.name = os.path.split(self.output_path)
+        self.keep = keep
+        self.fsync = fsync
+        self.path = None
+        self.swapped = False
+        self._discarded = False
+
+    def _sibling(self, kind):
+        # names sort by creation time, to the microsecond
+        now = time.time_ns()
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(now // 10 ** 9))
+        return os.path.join(self.parent, f".{self.name}.{kind}-{stamp}"
+                                         f".{now // 1000 % 10 ** 6:06d}-{os.getpid()}")
+
+    def siblings(self, kind):
+        """Existing staging or previous folders of this output, oldest first."""
+        prefix = f".{self.name}.{kind}-"
+        try:
+            names = sorted(name for name in os.listdir(self.parent) if name.startswith(prefix))
+        except OSError:
+            return []
+        return [os.path.join(self.parent, name) for name in names]
+
+    def begin(self):
+        """Create the staging folder and return its path."""
+        os.makedirs(self.parent, exist_ok=True)
+        for path in self.siblings('staging'):
+            try:
+                if time.time() - os.stat(path).st_mtime > STALE_STAGING_SECONDS:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                pass
+        self.path = self._sibling('staging')
+        if os.path.isdir(self.output_path):
+            # hard links cost no data copy; fall back to copying where unsupported
+            shutil.copytree(self.output_path, self.path, symlinks=True,
+                            copy_function=link_or_copy)
+        else:
+            os.makedirs(self.path)
+        return self.path
+
+    def discard(self):
+        """Drop the staged set; the live folder is not touched."""
+        self._discarded = True
+
+    def commit(self):
+        """Make the staged set live and prune old sets."""
+        if self.fsync:
+            for directory, _, files in os.walk(self.path):
+                for name in files:
+                    fsync_path(os.path.join(directory, name))
+                fsync_path(directory)
+
+        if not os.path.exists(self.output_path):
+            os.rename(self.path, self.output_path)
+        elif exchange(self.path, self.output_path):
+            # the staging path now holds the replaced set
+            os.rename(self.path, self._sibling('previous'))
+        else:
+            previous = self._sibling('previous')
+            os.rename(self.output_path, previous)
+            os.rename(self.path, self.output_path)
+        self.swapped = True
+        if self.fsync:
+            fsync_path(self.parent)
+        self.prune()
+
+    def prune(self):
+        """Remove previous sets beyond the newest self.keep."""
+        previous = self.siblings('previous')
+        for path in previous[:max(0, len(previous) - self.keep)]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def abort(self):
+        if self.path and os.path.exists(self.path):
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        self.begin()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and not self._discarded:
+            self.commit()
+        else:
+            self.abort()
+
+
+def link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
@@ -0,0 +1,70 @@
+"""
+Elsakr Favicon Generator - Modern Format Variants
+WebP and AVIF encoding within per-artifact time and size budgets.
+"""
+
+import time
+
+from encoding import encode_image
+
+# Target type -> Pillow format name
+FORMATS = {'webp': 'WEBP', 'avif': 'AVIF'}
+
+# Qualities tried, best first, until the size budget is met
+DEFAULT_QUALITIES = (90, 80, 70, 60, 50)
+
+# Encode time budget per artifact (milliseconds)
+DEFAULT_MAX_MS = 500
+
+_available = {}
+
+
+def available(fmt):
+    """True if this Pillow build can write fmt ('webp' or 'avif')."""
+    if fmt not in _available:
+        from PIL import features
+        try:
+            _available[fmt] = bool(features.check(fmt))
+        except ValueError:
+            # Pillow versions that predate the codec do not know the feature
+            _available[fmt] = False
+    return _available[fmt]
+
+
+def encode_once(img, fmt, quality):
+    params = {'lossless': True} if quality == 'lossless' else {'quality': quality}
+    return encode_image(img, FORMATS[fmt], **params)
+
+
+def encode_variant(img, fmt, qualities=DEFAULT_QUALITIES, max_bytes=None,
+                   max_ms=DEFAULT_MAX_MS):
+    """Encode img as fmt, searching qualities best first.
+
+    The search stops at the first quality whose output fits max_bytes, or
+    before an encode the rest of max_ms cannot fit (judged by the previous
+    one); if no setting fitted, the smallest output tried is kept. An
+    encode cannot be interrupted, so a slow first one still overruns
+    max_ms: within_budget is true only when both budgets were met. A
+    quality may be 'lossless' (WebP). Returns (data, report).
+    """
+    start = time.perf_counter()
+    tried = []
+    chosen = None
+    last = 0.0
+    for quality in qualities:
+        if tried and (time.perf_counter() - start + last) * 1000 > max_ms:
+            break
+        began = time.perf_counter()
+        data = encode_once(img, fmt, quality)
+        last = time.perf_counter() - began
+        tried.append((quality, data))
+        if max_bytes is None or len(data) <= max_bytes:
+            chosen = (quality, data)
+            break
+    seconds = time.perf_counter() - start
+    within = chosen is not None and seconds * 1000 <= max_ms
+    if chosen is None:
+        chosen = min(tried, key=lambda item: len(item[1]))
+    quality, data = chosen
+    return data, {'format': fmt, 'quality': quality, 'bytes': len(data),
+                  'tried': len(tried), 'within_budget': within, 'seconds': seconds}
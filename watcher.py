@@ -0,0 +1,234 @@
+"""
+Elsakr Favicon Generator - Source Watcher
+Detect changes to source images with inotify or stat polling.
+"""
+
+import os
+import sys
+import time
+import select
+import struct
+import threading
+
+from engine import IMAGE_EXTENSIONS, master_paths, master_source
+
+DEFAULT_DEBOUNCE = 0.3
+
+POLL_INTERVAL = 1.0
+
+# inotify event masks (linux/inotify.h)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+EVENT = struct.Struct('iIII')
+
+
+class WatchSet:
+    """The files and directories being watched.
+
+    Files are watched through their parent directory, so editors that
+    save by writing a temporary file and renaming it over the original
+    are still seen. A watched file's size masters (logo@16.png for
+    logo.png) are watched with it.
+    """
+
+    def __init__(self, paths):
+        self.files = set()
+        self.dirs = set()
+        for path in paths:
+            path = os.path.abspath(path)
+            if os.path.isdir(path):
+                self.dirs.add(path)
+            else:
+                self.files.add(path)
+
+    def directories(self):
+        return self.dirs | {os.path.dirname(path) for path in self.files}
+
+    def matches(self, path):
+        """True if a change to path concerns a watched source."""
+        if path in self.files or master_source(path) in self.files:
+            return True
+        return (os.path.dirname(path) in self.dirs
+                and path.lower().endswith(IMAGE_EXTENSIONS))
+
+    def snapshot(self):
+        """(mtime, size) of every watched source that exists."""
+        state = {}
+        for path in self.files | {master for path in self.files
+                                  for master in master_paths(path)}:
+            try:
+                st = os.stat(path)
+                state[path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                pass
+        for directory in self.dirs:
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                            st = entry.stat()
+                            state[entry.path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                pass
+        return state
+
+
+class PollingBackend:
+    """Compare stat snapshots every interval seconds."""
+
+    name = 'polling'
+
+    def __init__(self, watch_set, interval=POLL_INTERVAL):
+        self.watch_set = watch_set
+        self.interval = interval
+        self._state = watch_set.snapshot()
+        self._stop = threading.Event()
+
+    def wait(self, timeout=None):
+        """Changed paths, or an empty set after timeout or stop()."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._stop.is_set():
+            state = self.watch_set.snapshot()
+            changed = {path for path in state.keys() | self._state.keys()
+                       if state.get(path) != self._state.get(path)}
+            self._state = state
+            if changed:
+                return changed
+            wait = self.interval
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    break
+            self._stop.wait(wait)
+        return set()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        pass
+
+
+class InotifyBackend:
+    """Block on Linux inotify events for the watched directories."""
+
+    name = 'inotify'
+
+    def __init__(self, watch_set):
+        import ctypes
+        import ctypes.util
+        self.watch_set = watch_set
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._stop_read, self._stop_write = os.pipe()
+        self.dirs = {}
+        try:
+            for directory in watch_set.directories():
+                wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), f"cannot watch {directory}")
+                self.dirs[wd] = directory
+        except OSError:
+            self.close()
+            raise
+
+    def wait(self, timeout=None):
+        """Changed paths, or an empty set after timeout or stop()."""
+        ready, _, _ = select.select([self.fd, self._stop_read], [], [], timeout)
+        if self.fd not in ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if wd in self.dirs and name:
+                path = os.path.join(self.dirs[wd], os.fsdecode(name))
+                if self.watch_set.matches(path):
+                    changed.add(path)
+        return changed
+
+    def stop(self):
+        try:
+            os.write(self._stop_write, b'x')
+        except OSError:
+            pass
+
+    def close(self):
+        for fd in (self.fd, self._stop_read, self._stop_write):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def create_backend(watch_set, polling=False):
+    """inotify on Linux when available, stat polling otherwise."""
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyBackend(watch_set)
+        except (OSError, AttributeError):
+            pass
+    return PollingBackend(watch_set)
+
+
+class SourceWatcher:
+    """Report changed source images, debouncing bursts of writes.
+
+    on_change(paths) is called with the set of changed sources once no
+    further change has arrived for debounce seconds, so an editor's
+    several writes per save trigger one render. Between changes the
+    watcher blocks in select() (inotify) or sleeps between stat passes,
+    so it uses next to no CPU while idle.
+    """
+
+    def __init__(self, paths, on_change, debounce=DEFAULT_DEBOUNCE, polling=False):
+        self.on_change = on_change
+        self.debounce = debounce
+        self.watch_set = WatchSet(paths)
+        self.backend = create_backend(self.watch_set, polling)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def run(self):
+        """Deliver changes on the calling thread until stop()."""
+        try:
+            while not self._stopped.is_set():
+                changed = self.backend.wait()
+                while changed and not self._stopped.is_set():
+                    more = self.backend.wait(self.debounce)
+                    if not more:
+                        break
+                    changed |= more
+                if changed and not self._stopped.is_set():
+                    self.on_change(changed)
+        finally:
+            self.backend.close()
+
+    def start(self):
+        """Deliver changes on a background thread."""
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self.backend.stop()